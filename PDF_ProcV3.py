@@ -1,21 +1,20 @@
 #PDF_Proc.py
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QCheckBox,
-    QFileDialog, QLabel, QMessageBox, QGridLayout, QDesktopWidget, QComboBox, QHBoxLayout, QSpacerItem, QSizePolicy, QTabWidget
+    QFileDialog, QLabel, QMessageBox, QGridLayout, QDesktopWidget, QComboBox, QHBoxLayout, QSpacerItem, QSizePolicy, QTabWidget,
+    QTreeWidget, QTreeWidgetItem, QHeaderView
 )
-from PyQt5.QtCore import pyqtSlot, QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import pyqtSlot, QThread, pyqtSignal, Qt, QUrl
+from PyQt5.QtGui import QIcon, QDesktopServices
 import sys
 import os
-import shutil
-import pandas as pd
-from PyPDF2 import PdfReader, PdfWriter
-from azure.ai.formrecognizer import DocumentAnalysisClient, DocumentField
-from azure.core.credentials import AzureKeyCredential
-import re
-import win32com.client
+import time
 import importlib
 from datetime import datetime
+from settings import get_setting
+from pipeline import Pipeline, base_path, document_paths
+from progress import ThrottledListener, listen, QUEUED, WRITTEN, FAILED
+from cancellation import CancellationToken
 date = datetime.now().strftime("%m-%d_%H_%M")
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -25,9 +24,7 @@ scanner_module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(scanner_module)
 
 
-# Azure credentials and paths
-
-base_path = "C:/Users/daniel.pace/Documents/Coding/PO Automation/Azure/"
+# Paths
 
 paths = {
     'input': os.path.join(base_path, 'Input/'),
@@ -36,14 +33,20 @@ paths = {
     'archive_input': os.path.join(base_path, 'Input/Archive/'),
     'archive_processed': os.path.join(base_path, 'Processed/Archive/')
 }
+
 # Worker thread
 class WorkerThread(QThread):
     finished = pyqtSignal()
-    progress = pyqtSignal(int)
+    progress = pyqtSignal(int)  # Pages finished (written or failed) so far
+    events = pyqtSignal(list)  # Batches of progress.ProgressEvent
     def __init__(self, func, *args, **kwargs):
         """
         Initializes a new instance of the class.
 
+        Progress events reported by func (see progress.py) are sent to the GUI in batches,
+        at most every gui.progress_interval_seconds. cancel() stops func cooperatively
+        through a cancellation token (see cancellation.py).
+
         Args:
             func (callable): The function to be called.
             *args: Variable length argument list.
@@ -56,10 +59,28 @@ class WorkerThread(QThread):
         self.func = func
         self.args = args
         self.kwargs = kwargs
+        self.result = None  # What func returned, once finished has been emitted
+        self.pagesFinished = 0
+        self.listener = ThrottledListener(self.emitEvents, get_setting('gui', 'progress_interval_seconds', 0.25))
+        self.token = CancellationToken()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def emitEvents(self, events):
+        # Called from the pipeline's threads; the signals are delivered on the GUI thread
+        self.pagesFinished += sum(1 for event in events if event.page is not None and event.state in (WRITTEN, FAILED))
+        self.events.emit(events)
+        self.progress.emit(self.pagesFinished)
 
     def run(self):
-        self.func(*self.args, **self.kwargs)
-        self.finished.emit()
+        try:
+            with listen(self.listener), self.token.activate():
+                self.result = self.func(*self.args, **self.kwargs)
+        finally:
+            # Also after an error, so the GUI does not stay on "Processing..." with its buttons disabled
+            self.listener.flush()
+            self.finished.emit()
         
 # Main Application Window
 class PDFProcessingApp(QMainWindow):
@@ -87,7 +108,7 @@ class PDFProcessingApp(QMainWindow):
         """
         self.setWindowIcon(QIcon('icons\\appIcon.png'))
         self.setWindowTitle('PDF Processing App')
-        self.setGeometry(300, 300, 500, 300)  # Increase window size for better layout
+        self.setGeometry(300, 300, 700, 500)  # Increase window size for better layout
         self.center()
 
         # Create a central widget to hold other widgets
@@ -113,6 +134,14 @@ class PDFProcessingApp(QMainWindow):
         layout = QVBoxLayout(self.centralWidget)
         layout.addWidget(self.tabWidget)
 
+        # Live queue of documents and their pages; double-click a finished one to open its output
+        self.queueView = QTreeWidget(self.centralWidget)
+        self.queueView.setHeaderLabels(['Document', 'State', 'Seconds'])
+        self.queueView.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.queueView.itemDoubleClicked.connect(self.openQueueItem)
+        self.queueItems = {}
+        layout.addWidget(self.queueView)
+
         # Create a top layout for status and document type
         topLayout = QHBoxLayout()
 
@@ -124,6 +153,10 @@ class PDFProcessingApp(QMainWindow):
         topLayout.addItem(spacer)
 
         
+        # Documents the job ledger has as done are skipped unless this is checked
+        self.reprocessCheckbox = QCheckBox("Reprocess finished documents", self)
+        topLayout.addWidget(self.reprocessCheckbox)
+
         self.statusLabel = QLabel('Status: Ready', self)
         self.statusLabel.setStyleSheet("QLabel { color: green; font-weight: bold; }")  # Add styling to status label
         topLayout.addWidget(self.statusLabel)
@@ -136,9 +169,18 @@ class PDFProcessingApp(QMainWindow):
         spacer = QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding)
         layout.addItem(spacer)
 
+        bottomLayout = QHBoxLayout()
+        bottomLayout.addStretch()
+
+        self.cancelButton = QPushButton('Cancel batch', self)
+        self.cancelButton.setEnabled(False)
+        self.cancelButton.clicked.connect(self.cancelBatch)
+        bottomLayout.addWidget(self.cancelButton)
+
         self.exitButton = QPushButton('Exit', self)
-        self.exitButton.clicked.connect(QApplication.instance().quit)
-        layout.addWidget(self.exitButton, alignment=Qt.AlignRight)  # Align exit button to the right
+        self.exitButton.clicked.connect(self.close)  # Goes through closeEvent, which cancels running batches
+        bottomLayout.addWidget(self.exitButton)
+        layout.addLayout(bottomLayout)  # Buttons aligned to the right
 
     def center(self):
         qr = self.frameGeometry()
@@ -208,39 +250,23 @@ class PDFProcessingApp(QMainWindow):
         """
         Processes files based on the document type passed from the tab.
         """
-        # Set paths and credentials based on the document type
-        if doc_type == 'Invoice':
-            endpoint = "https://phh-invoices.cognitiveservices.azure.com/"
-            base_doc_path = os.path.join(base_path, "Invoices/")
-            key = os.getenv("AZURE_API_KEY_PHH-INVOICES")
-            
-        else:  # Purchase Order
-            endpoint = "https://pos.cognitiveservices.azure.com/"
-            key = os.getenv("AZURE_API_KEY_POS")
-            base_doc_path = base_path + "Purchase Orders/"
-
-        # Update paths based on the document type
-        paths = {
-            'input': os.path.join(base_doc_path, 'Input/'),
-            'processed': os.path.join(base_doc_path, 'Processed/'),
-            'output': os.path.join(base_doc_path, 'Output/'),
-            'archive_input': os.path.join(base_doc_path, 'Input/Archive/'),
-            'archive_processed': os.path.join(base_doc_path, 'Processed/Archive/')
-        }
-        
-        # Create the credential and client with the selected endpoint and key
-        credential = AzureKeyCredential(key)
-        self.client = DocumentAnalysisClient(endpoint=endpoint, credential=credential)
+        paths = document_paths(doc_type)
 
         if hasattr(self, 'files') and self.files:
             process_button.setEnabled(False)
             self.statusLabel.setText('Status: Processing...')
             
             multi_page = self.multiPageCheckbox.isChecked()  # Check the state of the checkbox
-            self.worker = WorkerThread(self.processPDFs, self.files, paths, multi_page, doc_type)
-            self.worker.finished.connect(lambda: self.onProcessingComplete(doc_type))  # Pass doc_type to the onProcessingComplete function
-            self.worker.start()
-            self.runningThreads.append(self.worker)  # Keep track of the thread
+            reprocess = self.reprocessCheckbox.isChecked()
+            # A PO and an invoice batch can run at once, so each keeps its own pipeline and worker
+            pipeline = Pipeline.for_doc_type(doc_type)
+            worker = WorkerThread(pipeline.processPDFs, self.files, paths, multi_page, doc_type, reprocess=reprocess)
+            worker.finished.connect(lambda: self.onProcessingComplete(doc_type, worker, pipeline, process_button))
+            worker.events.connect(self.onProgressEvents)
+            worker.progress.connect(lambda pages: self.statusLabel.setText(f'Status: Processing... {pages} pages done'))
+            worker.start()
+            self.runningThreads.append(worker)  # Keep track of the thread
+            self.cancelButton.setEnabled(True)
         else:
             QMessageBox.warning(self, 'Warning', 'No files have been imported.')
 
@@ -256,312 +282,111 @@ class PDFProcessingApp(QMainWindow):
     def onWorkerFinished(self, worker):
         self.runningThreads.remove(worker)  
 
-
-    def processPDFs(self, files, paths, multi_page, doc_type):
+    def queueItem(self, document, page=None):
         """
-        Process a list of PDF files based on the document type.
-
-        Args:
-            files (list): A list of file paths to the PDF files.
-            paths (dict): A dictionary containing the paths for input, processed, output, and archive directories.
-
-        Returns:
-            None
+        Returns the queue view row of a document, or of one of its pages, adding it if needed.
         """
-    
-        for file_path in files:
-            if not os.path.exists(file_path):
-                QMessageBox.critical(self, "Error", f"File not found: {file_path}")
-                continue
-
-            # Extract filename for use in paths
-            filename = os.path.basename(file_path)
-
-             # Debug: Print paths to verify
-            print(f"Copying from: {file_path}")
-            print(f"Copying to: {os.path.join(paths['input'], filename)}")
-
-        # Ensure the source file exists
-            if not os.path.exists(file_path):
-                print(f"Error: Source file does not exist: {file_path}")
-                continue
-
-            # Step 1: Copy file to the 'input' directory
-            shutil.copy(file_path, os.path.join(paths['input'], filename))
-
-            # Step 2: Split PDF
-            # Note: split_pdf now takes a single file path, not a directory
-            self.split_pdf(os.path.join(paths['input'], filename), paths)
-
-            # Step 3: Analyze documents based on the document type
-            if doc_type == 'Invoice':
-                self.process_invoices(paths, multi_page)
-            elif doc_type == 'Purchase Order':
-                self.analyze_general_documents(paths)
-
-            # Step 4: Move original file to 'archive_input'
-            shutil.move(os.path.join(paths['input'], filename), os.path.join(paths['archive_input'], filename))
-
-            # Note: Moving processed files to 'archive_processed' should be handled within the respective processing functions
+        key = (document, page)
+        if key not in self.queueItems:
+            if page is None:
+                item = QTreeWidgetItem(self.queueView, [document, QUEUED, ''])
+            else:
+                item = QTreeWidgetItem(self.queueItem(document), [page, QUEUED, ''])
+            self.queueItems[key] = item
+        return self.queueItems[key]
 
-    
-    @pyqtSlot()
-    def onProcessingComplete(self, doc_type):
+    @pyqtSlot(list)
+    def onProgressEvents(self, events):
         """
-        Called when processing is complete.
+        Updates the queue view with a batch of progress events from the worker thread.
         """
-        if doc_type == 'Purchase Order':
-            self.statusLabel.setText('Status: Purchase Order Processing Complete. Running Batch Clean...')
-            self.runVbaMacro()  # Automatically run the batch clean for Purchase Orders
-        else:
-            self.statusLabel.setText('Status: Invoice Processing Complete.')
-        
-        self.processButton_PO.setEnabled(True)
-        self.processButton_Invoice.setEnabled(True)
-        QMessageBox.information(self, 'Complete', f'{doc_type} files have been processed.')
-        
-        # Assuming you know which thread called this, you can remove it from the list:
-        self.runningThreads.remove(self.worker)
-        self.worker = None  # Remove reference to the worker
-
-    def split_pdf(self, file_path, paths):
+        for event in events:
+            item = self.queueItem(event.document, event.page)
+            item.setText(1, f'{event.state}: {event.error}' if event.error else event.state)
+            item.setToolTip(1, event.error or '')
+            if event.seconds is not None:
+                item.setText(2, f'{event.seconds:.1f}')
+            if event.outputs:
+                item.setData(0, Qt.UserRole, list(event.outputs))
+            if event.page is not None:
+                document_item = self.queueItem(event.document)
+                if document_item.text(1) == QUEUED:
+                    document_item.setText(1, 'processing')
+
+    @pyqtSlot(QTreeWidgetItem, int)
+    def openQueueItem(self, item, column):
         """
-        Splits a PDF file into multiple pages.
-
-        Parameters:
-            file_path (str): The path to the PDF file to be split.
-            paths (dict): A dictionary containing the paths for processed files.
-
-        Returns:
-            None
+        Opens the output of a finished document or page: the file itself if there is one
+        workbook, otherwise the folder holding the outputs.
         """
-        # Ensure the path points to a file
-        if not file_path.endswith(".pdf"):
-            print(f"Error: {file_path} is not a PDF file.")
+        outputs = item.data(0, Qt.UserRole)
+        if not outputs:
+            self.statusLabel.setText(f'Status: No output for {item.text(0)} yet.')
             return
+        workbooks = [path for path in outputs if path.endswith('.xlsx')] or outputs
+        path = workbooks[0] if len(workbooks) == 1 else os.path.dirname(workbooks[0])
+        QDesktopServices.openUrl(QUrl.fromLocalFile(path))
 
-        # Initialize PdfReader with the provided file path
-        pdf = PdfReader(file_path)
-        for i, page in enumerate(pdf.pages):
-            pdf_writer = PdfWriter()
-            pdf_writer.add_page(page)
-
-            # Construct output filename for each page
-            output_filename = f"{os.path.splitext(os.path.basename(file_path))[0]}_{i + 1}.pdf"
-            output_filepath = os.path.join(paths['processed'], output_filename)
-
-            # Write out each page as a separate PDF
-            with open(output_filepath, 'wb') as out:
-                pdf_writer.write(out)
-
-    def extract_table_data(self, table):
-        table_data = []
-        row_data = []
-        current_row_index = 0
-        for cell in sorted(table.cells, key=lambda c: (c.row_index, c.column_index)):
-            if cell.row_index != current_row_index:
-                table_data.append(row_data)
-                row_data = []
-                current_row_index = cell.row_index
-            row_data.append(cell.content)
-        table_data.append(row_data)  # Append the last row
-        return table_data
-    
-    def extract_invoice_data(self, file_path):
-        """Extract invoice data using Azure Form Recognizer"""
-        
-        errors = []
-        invoice_data = None
-        
-        try:
-            with open(file_path, "rb") as fd:
-                document = fd.read()
-
-            poller = self.client.begin_analyze_document("prebuilt-invoice", document)  
-            result = poller.result()
-            
-            invoice_data = result.documents[0].fields
-
-        except Exception as e:
-            errors.append(f"Error processing {file_path}: {e}")
-            
-        if errors:
-            self.log_errors(errors)
-            
-        return invoice_data
-
-    def invoice_dfs(self, invoice_data_list):
-        """Convert extracted invoice data into DataFrames"""
-        
-        all_data_dfs = []
-        line_items_dfs = []
-
-        for invoice_data in invoice_data_list:
-            
-            all_data = {key: value.value if isinstance(value, DocumentField) else value
-                        for key, value in invoice_data.items() if key != 'Items'}
-                        
-            all_data_df = pd.DataFrame([all_data])
-            all_data_dfs.append(all_data_df)
-                
-            if 'Items' in invoice_data:
-                line_items = []
-                for item in invoice_data['Items'].value:
-                    line_item = {key: value.value if isinstance(value, DocumentField) else value
-                                for key, value in item.value.items()}
-                    line_items.append(line_item)
-                        
-                line_items_df = pd.DataFrame(line_items)
-                line_items_df.index = range(1, len(line_items_df) + 1)
-                line_items_dfs.append(line_items_df)
-            else:
-                # If 'Items' key is not present, add an empty DataFrame
-                line_items_dfs.append(pd.DataFrame())
-
-        return all_data_dfs, line_items_dfs
-
-    def process_invoices(self, paths, multi_page):
-        files = [f for f in os.listdir(paths['processed']) if f.endswith(".pdf")]
-        all_line_items_df = pd.DataFrame()
-        for file in files:
-            file_path = os.path.join(paths['processed'], file)
-            
-            invoice_data = self.extract_invoice_data(file_path)
-            if invoice_data:
-                all_data_dfs, line_items_dfs = self.invoice_dfs([invoice_data])
-
-                for all_data_df, line_items_df in zip(all_data_dfs, line_items_dfs):
-                    self.save_document_output(all_data_df, line_items_df, os.path.splitext(os.path.basename(file_path))[0], 'Invoice', paths)
-
-                if multi_page:
-                    # Aggregate line items across all files if multi-page is checked
-                    all_line_items_df = pd.concat([all_line_items_df] + line_items_dfs, ignore_index=True)
-
-        if multi_page:
-            # Save aggregated line item data only if multi-page is checked
-            self.save_aggregated_output(all_line_items_df, 'invoices', paths, os.path.splitext(os.path.basename(file_path))[0])
-
-        # Move files to archive_processed
-        for file in files:
-            file_path = os.path.join(paths['processed'], file)
-            shutil.move(file_path, os.path.join(paths['archive_processed'], file))
-
-    def analyze_general_documents(self, paths):
+    @pyqtSlot()
+    def cancelBatch(self):
+        """
+        Cancels the running batches. Pages in flight are abandoned and, like the pages not
+        started yet, are left in the job ledger for the next run.
         """
-        Analyze general documents such as purchase orders.
+        for worker in self.runningThreads:
+            worker.cancel()
+        self.cancelButton.setEnabled(False)
+        self.statusLabel.setText('Status: Cancelling...')
 
-        Args:
-            paths (dict): A dictionary containing the paths for input, processed, output, and archive directories.
+    @pyqtSlot()
+    def onProcessingComplete(self, doc_type, worker, pipeline, process_button):
         """
-        files = [f for f in os.listdir(paths['processed']) if f.endswith(".pdf")]
-        
-        for file in files:
-            file_path = os.path.join(paths['processed'], file)
-            with open(file_path, "rb") as fd:
-                document = fd.read()
-            poller = self.client.begin_analyze_document("prebuilt-document", document)
-            result = poller.result()
-            for i, table in enumerate(result.tables):
-                df = pd.DataFrame(self.extract_table_data(table))
-                df.columns = df.iloc[0]  # Use the first row as column headers
-                df = df.drop(df.index[0])  # Drop the first row now that headers are set
-                df = self.replace_import_headers(df)  # Optionally replace headers based on your logic
-                df.to_excel(os.path.join(paths['output'], f"{os.path.splitext(file)[0]}_table_{i}.xlsx"), index=False)
-            
-            shutil.move(file_path, os.path.join(paths['archive_processed'], file))
-    def move_to_archive(self, path, archive_path):
-        for file in os.listdir(base_path + path):
-            if os.path.isfile(base_path + path + file):
-                shutil.move(base_path + path + file, base_path + archive_path + file)
-    def replace_import_headers(self, df):
-        try:
-            
-            df.columns = df.columns.astype(str).str.lower()
-
-            # Check if any of the target words are present in the header row
-            target_words = ["order", "items", "quantity", "qty", "cost", "unit price", "price", "#", "amount"]
-            if not any(word in df.columns for word in target_words):
-                return df  # Skip replacements if no target words are found
-
-            # Initially handle 'amount' specifically
-            if 'amount' in df.columns:
-                index = df.columns.tolist().index('amount')
-                if index == 0:
-                    df.rename(columns={'amount': 'quantity'}, inplace=True)
-                elif index == len(df.columns) - 1:
-                    df.rename(columns={'amount': 'total'}, inplace=True)
-
-            # Define replacements after handling 'amount'
-            replacements = {k: v for k, v in zip(
-                ["order", "items", "quantity", "qty", "cost", "unit price", "price", "#"], 
-                ["pu_quant"] * 4 + ["pu_price"] * 4)}
-
-            # Apply the replacements for other headers
-            df.rename(columns={col: replacements.get(col, col) for col in df.columns}, inplace=True)
-
-            # Part number identification and renaming
-            part_number_column_index = None
-            part_number_pattern = re.compile(r'P\d{2}-\d{3}-\d{3}')
-            for index, column in enumerate(df.columns):
-                # Check if any cell in the column matches the part number pattern
-                if df[column].astype(str).str.match(part_number_pattern).any():
-                    part_number_column_index = index
-                    break
-
-            if part_number_column_index is not None:
-                # Directly set the column name in the DataFrame's columns attribute
-                df.columns.values[part_number_column_index] = 'pr_codenum'
+        Called when the batch run by worker is complete.
+        """
+        self.runningThreads.remove(worker)
+        self.cancelButton.setEnabled(bool(self.runningThreads))
+        process_button.setEnabled(True)
 
-        except Exception as e:
-            print(f"Error occurred while replacing import headers: {e}")
-            # Optionally, log the error or handle it as per requirement
-            return df  # Return the dataframe even if an error occurs to not interrupt the flow
+        if worker.token.cancelled:
+            self.statusLabel.setText('Status: Batch cancelled. Pages that were not written will be processed by the next run.')
+            return
+
+        if doc_type == 'Purchase Order' and get_setting('batch_clean', 'native', False):
+            self.statusLabel.setText('Status: Purchase Order Processing Complete.')  # Tables were cleaned as they were written
+        elif doc_type == 'Purchase Order':
+            self.statusLabel.setText('Status: Purchase Order Processing Complete. Running Batch Clean...')
+            self.runVbaMacro()  # Automatically run the batch clean for Purchase Orders
+        else:
+            self.statusLabel.setText('Status: Invoice Processing Complete.')
+
+        # Timings from the run report written next to the outputs
+        report = pipeline.last_report
+        if report is not None:
+            self.statusLabel.setText(f'{self.statusLabel.text()} {report.summary()}')
+
+        skipped = worker.result or []
+        if skipped:
+            names = "\n".join(os.path.basename(path) for path in skipped)
+            QMessageBox.information(self, 'Complete', f'{doc_type} files have been processed, except {len(skipped)} '
+                                    f'already processed or claimed by another worker:\n{names}\n\n'
+                                    'Check "Reprocess finished documents" to process them again.')
+        else:
+            QMessageBox.information(self, 'Complete', f'{doc_type} files have been processed.')
 
-        return df
     @pyqtSlot()
     def pullPrices(self):
         """
         Slot method to handle the 'Pull Prices' button click.
         """
         try:
-            self.pullPricesFromExcel()
+            Pipeline().pullPricesFromExcel()
             QMessageBox.information(self, 'Success', 'Prices have been pulled successfully.')
         except Exception as e:
             QMessageBox.warning(self, 'Error', f'An error occurred: {e}')
-    def pullPricesFromExcel(self):
-        """
-        Method to pull prices from Excel files in a folder and process them.
-
-        Args:
-        folder_path (str): Path to the folder containing Excel files.
-        """
-        folder_path = "P:/Temp"
-        # Get a list of all Excel files in the folder
-        excel_files = [f for f in os.listdir(folder_path) if f.endswith(".xlsx")]
-        for file in excel_files:
-            try:
-                # Construct full path to the current file
-                file_path = os.path.join(folder_path, file)
-
-                # Read the current Excel file
-                original_df = pd.read_excel(file_path, engine='openpyxl')
-
-                # Load the LPC Excel file
-                lpc_df = pd.read_excel(
-                    r"C:\Users\daniel.pace\Documents\Coding\Purchasing Automation\PA_V4\Price Comparison\Last Part Cost 3.1.xlsx",
-                    sheet_name='All')
-                
-                # Map PO Cost from LPC to original dataframe based on part numbers
-                original_df = original_df.merge(lpc_df[['pr_codenum', 'PO Cost']], on='pr_codenum', how='left')
-
-                # Save the processed data to a new file with the original filename
-                original_df.to_excel(os.path.join(folder_path, f"processed_{file}"), index=False)
-            except Exception as e:
-                print(f"Error processing {file}: {e}")
-                continue
     def runVbaMacro(self):
         excel = None  # Initialize excel variable to ensure it's in scope for the finally block
         try:
+            import win32com.client  # Only available on Windows with Excel installed
             excel = win32com.client.Dispatch('Excel.Application')  # Using late binding
             excel.Visible = True  # Set to False if you don't want Excel to be visible
 
@@ -589,36 +414,23 @@ class PDFProcessingApp(QMainWindow):
             # Update the status label
             self.statusLabel.setText("Status: Batch Clean Complete.")
 
-        
-    def save_document_output(self, all_data_df, line_items_df, file_name, doc_type, paths):
-        output_dir = paths['output']
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        output_file_path = os.path.join(output_dir, f'{file_name}.xlsx')
-        with pd.ExcelWriter(output_file_path, engine='xlsxwriter') as writer:
-            all_data_df.to_excel(writer, sheet_name=f'{doc_type} Details', index=False)
-            line_items_df.to_excel(writer, sheet_name='Line Items', index=True)  # Keeping index=True since you want the index to start from 1
-
-    def save_aggregated_output(self, dataframe, data_type, paths, file_name):
-        output_dir = paths['output']
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        output_file_path = os.path.join(output_dir, f'{file_name}_aggregated.xlsx')
-        with pd.ExcelWriter(output_file_path, engine='xlsxwriter') as writer:
-            dataframe.to_excel(writer, sheet_name=f'Aggregated {data_type.capitalize()}')
-
     def closeEvent(self, event):
+        # Cancel instead of waiting for every remaining page to come back from Azure
+        for worker in self.runningThreads:
+            worker.cancel()
+        deadline = time.monotonic() + 1
         for worker in self.runningThreads:
-            worker.wait()  # Wait for the thread to finish
+            worker.wait(max(0, int((deadline - time.monotonic()) * 1000)))  # Wait for the thread to finish
         event.accept()  # Now it's safe to close  
         
 def main():
     app = QApplication(sys.argv)
     ex = PDFProcessingApp()
     ex.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    for worker in ex.runningThreads:
+        worker.wait()  # Only a page upload that was already under way can still be running
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
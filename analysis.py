@@ -0,0 +1,296 @@
+#analysis.py
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+from itertools import islice
+
+from azure.core.exceptions import ResourceNotFoundError
+from settings import azure_settings
+from pdf_pages import read_page
+from run_report import current_report
+from cancellation import Cancelled, current_token
+from scheduler import is_retryable
+import progress
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+# How often waits for a connection slot or for a poller check whether the batch was cancelled
+CANCEL_CHECK_SECONDS = 0.2
+
+# One semaphore per endpoint, shared by every pool that talks to it, so a PO batch
+# and an invoice batch running at the same time cannot exceed the endpoint's limit
+_endpoint_limits = {}
+_endpoint_limits_lock = threading.Lock()
+
+
+def get_max_concurrency(service):
+    """
+    Returns the configured number of in-flight requests for an Azure service.
+
+    Args:
+        service (str): The key of the service under azure_settings in config.yaml.
+
+    Returns:
+        int: The max_concurrency setting, or DEFAULT_MAX_CONCURRENCY if not set.
+    """
+    return int(azure_settings.get(service, {}).get('max_concurrency', DEFAULT_MAX_CONCURRENCY))
+
+
+def endpoint_limit(endpoint, max_concurrency):
+    """
+    Returns the semaphore guarding an endpoint, creating it on first use.
+    """
+    with _endpoint_limits_lock:
+        if endpoint not in _endpoint_limits:
+            _endpoint_limits[endpoint] = threading.BoundedSemaphore(max_concurrency)
+        return _endpoint_limits[endpoint]
+
+
+class AnalysisPool:
+    def __init__(self, client, endpoint, max_concurrency=DEFAULT_MAX_CONCURRENCY, cache=None, scheduler=None):
+        """
+        Runs Form Recognizer analyses with a bounded number of pollers in flight.
+
+        Args:
+            client (DocumentAnalysisClient): The client used to submit documents.
+            endpoint (str): The endpoint the client talks to; used to share the limit.
+            max_concurrency (int): Maximum number of requests in flight for the endpoint.
+            cache (ResultCache, optional): Cache consulted before submitting a document.
+            scheduler (RequestScheduler, optional): Rate limit and retries for the endpoint.
+        """
+        self.client = client
+        self.cache = cache
+        self.api_version = getattr(client, '_api_version', None) or 'default'
+        self.endpoint = endpoint
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.limit = endpoint_limit(endpoint, self.max_concurrency)
+        self.scheduler = scheduler
+
+    def analyze(self, model_id, document, label=None, continuation_token=None, **kwargs):
+        """
+        Submits a single document and blocks until its poller completes.
+
+        Args:
+            model_id (str): The model to use, e.g. "prebuilt-document".
+            document (bytes): The document content.
+            label (str, optional): Name of the document in retry messages.
+            continuation_token (str, optional): Resumes the poller of an earlier analysis of the
+                document that was cancelled, instead of uploading it again.
+            **kwargs: Passed through to begin_analyze_document.
+
+        Returns:
+            AnalyzeResult: The result of the analysis.
+
+        Raises:
+            Cancelled: If the batch is cancelled; its continuation_token resumes the analysis later.
+        """
+        report = current_report()
+        if self.cache is not None:
+            with report.stage('cache lookup'):
+                result = self.cache.get(model_id, self.api_version, document, **kwargs)
+            if result is not None:
+                report.count('cache_hits')
+                return result
+
+        result = None
+        if continuation_token is not None:
+            result = self._resume(model_id, label, continuation_token)
+        if result is None:
+            result = self._submit(model_id, document, label, **kwargs)
+
+        if self.cache is not None:
+            with report.stage('cache lookup'):
+                self.cache.put(model_id, self.api_version, document, result, **kwargs)
+        return result
+
+    def _acquire(self):
+        report = current_report()
+        cancel = current_token()
+        with report.stage('concurrency wait'):
+            cancel.raise_if_cancelled()
+            while not self.limit.acquire(timeout=CANCEL_CHECK_SECONDS):
+                cancel.raise_if_cancelled()
+
+    def _submit(self, model_id, document, label=None, **kwargs):
+        # Only the upload goes through the scheduler's retries, so a failure while polling never
+        # uploads (and bills) the page again. A throttled upload waits outside the concurrency
+        # limit, so other pages can use the slot.
+        upload = partial(self._upload, model_id, document, label, **kwargs)
+        poller = self.scheduler.call(upload, label) if self.scheduler is not None else upload()
+        try:
+            with current_report().stage('analyze'):
+                return self._poll(poller, model_id, label)
+        finally:
+            self.limit.release()
+
+    def _upload(self, model_id, document, label=None, **kwargs):
+        """
+        Takes a connection slot and starts an analysis. The slot is kept for polling if the upload succeeds.
+        """
+        report = current_report()
+        self._acquire()
+        try:
+            with report.stage('upload'):
+                report.count('requests')
+                report.count('bytes_uploaded', len(document))
+                progress.emit(progress.UPLOADING, label)
+                poller = self.client.begin_analyze_document(model_id, document, **kwargs)
+        except BaseException:
+            self.limit.release()
+            raise
+        progress.emit(progress.ANALYZING, label)
+        return poller
+
+    def _resume(self, model_id, label, continuation_token):
+        """
+        Resumes an analysis abandoned by a cancelled batch, or returns None if the service no longer has it.
+        """
+        self._acquire()
+        try:
+            with current_report().stage('analyze'):
+                progress.emit(progress.ANALYZING, label)
+                poller = self.client.begin_analyze_document(model_id, None, continuation_token=continuation_token)
+                return self._poll(poller, model_id, label)
+        except (ResourceNotFoundError, ValueError) as e:
+            # The service keeps results for 24 hours
+            print(f"Could not resume the analysis of {label or 'document'}, submitting it again: {e}")
+            return None
+        finally:
+            self.limit.release()
+
+    def _poll(self, poller, model_id, label=None):
+        """
+        Waits for the poller's result. If polling fails once the SDK's retries are spent, the
+        analysis is still running on the service, so the scheduler retries polling it from the
+        poller's continuation token instead of uploading the document again.
+        """
+        cancel = current_token()
+        try:
+            return self._wait(poller, cancel)
+        except Exception as e:
+            if self.scheduler is None or not is_retryable(e):
+                raise
+            poll_again = partial(self._poll_again, model_id, poller.continuation_token(), cancel)
+            return self.scheduler.call(poll_again, label)
+
+    def _poll_again(self, model_id, continuation_token, cancel):
+        poller = self.client.begin_analyze_document(model_id, None, continuation_token=continuation_token)
+        return self._wait(poller, cancel)
+
+    def _wait(self, poller, cancel):
+        """
+        Returns the poller's result, or abandons it with Cancelled if the batch is cancelled first.
+        """
+        # The poller polls on its own thread; an abandoned one stops once the service is done
+        while not poller.done():
+            if cancel.cancelled:
+                raise Cancelled("Cancelled while analyzing", poller.continuation_token())
+            poller.wait(CANCEL_CHECK_SECONDS)
+        return poller.result()
+
+    def _run(self, tasks):
+        """
+        Runs (label, callable) tasks on the pool and yields (index, label, result, error) as they complete.
+
+        Tasks are pulled from the iterable only as workers free up, so a generator of pages
+        being split is never held in memory all at once. Each task runs in a copy of the
+        caller's context, so it reports to the caller's run report. Once the batch is cancelled
+        no further tasks are pulled, and the tasks already submitted end with Cancelled.
+        """
+        cancel = current_token()
+        tasks = enumerate(tasks)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pending = {}
+            for index, (label, task) in islice(tasks, self.max_concurrency * 2):
+                pending[executor.submit(contextvars.copy_context().run, task)] = (index, label)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, label = pending.pop(future)
+                    refill = 0 if cancel.cancelled else 1  # Pages not pulled yet stay pending in the job ledger
+                    for next_index, (next_label, next_task) in islice(tasks, refill):
+                        pending[executor.submit(contextvars.copy_context().run, next_task)] = (next_index, next_label)
+                    try:
+                        yield index, label, future.result(), None
+                    except Exception as e:
+                        yield index, label, None, e
+
+    def analyze_pages(self, model_id, pages, continuation_tokens=None):
+        """
+        Analyzes pages concurrently.
+
+        Results are yielded as each poller completes, so the caller can write outputs
+        while the remaining pages are still being analyzed.
+
+        Args:
+            model_id (str): The model to use, e.g. "prebuilt-document".
+            pages (iterable): Page tuples from pdf_pages, either split in memory or on disk.
+            continuation_tokens (dict, optional): Page name -> continuation token of an analysis
+                abandoned by a cancelled batch.
+
+        Yields:
+            tuple: (index, page, result, error) where index is the position of the page
+            in pages and exactly one of result and error is None.
+        """
+        continuation_tokens = continuation_tokens or {}
+        tasks = ((page, partial(self._analyze_page, model_id, page, continuation_tokens.get(page.name))) for page in pages)
+        return self._run(tasks)
+
+    def _analyze_page(self, model_id, page, continuation_token=None):
+        return self.analyze(model_id, read_page(page), label=page.name, continuation_token=continuation_token)
+
+    def analyze_ranges(self, model_id, document, ranges, name=None, continuation_tokens=None):
+        """
+        Analyzes page ranges of a single document concurrently using the service's pages parameter.
+
+        Args:
+            model_id (str): The model to use, e.g. "prebuilt-invoice".
+            document (bytes): The content of the whole PDF.
+            ranges (list): Page ranges such as "1-10", see page_ranges.
+            name (str, optional): The document name; ranges are labelled "name_1-10" in messages.
+            continuation_tokens (dict, optional): Range label -> continuation token, as for analyze_pages.
+
+        Yields:
+            tuple: (index, pages, result, error) in completion order, as for analyze_pages.
+        """
+        continuation_tokens = continuation_tokens or {}
+        labels = {pages: f"{name}_{pages}" if name else pages for pages in ranges}
+        tasks = (
+            (pages, partial(self.analyze, model_id, document, label=labels[pages],
+                            continuation_token=continuation_tokens.get(labels[pages]), pages=pages))
+            for pages in ranges
+        )
+        return self._run(tasks)
+
+
+def page_ranges(page_count, pages_per_request):
+    """
+    Splits 1..page_count into range strings for the pages parameter, e.g. ["1-10", "11-12"].
+    """
+    pages_per_request = max(1, int(pages_per_request))
+    return [
+        f"{start}-{min(start + pages_per_request - 1, page_count)}"
+        for start in range(1, page_count + 1, pages_per_request)
+    ]
+
+
+def first_page(element):
+    """
+    Returns the page number an analyzed table or document starts on, or None if it has no regions.
+    """
+    regions = element.bounding_regions or []
+    return min((region.page_number for region in regions), default=None)
+
+
+def tables_by_page(result):
+    """
+    Groups the tables of an analysis result by the page they start on.
+
+    Returns:
+        dict: Page number -> list of tables on that page, in the order the service returned them.
+    """
+    pages = {}
+    for table in result.tables or []:
+        pages.setdefault(first_page(table), []).append(table)
+    return pages
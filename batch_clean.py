@@ -0,0 +1,68 @@
+#batch_clean.py
+import numpy as np
+from price_index import to_number
+from settings import get_setting
+
+NUMERIC_COLUMNS = ('pu_quant', 'pu_price', 'total')
+
+
+def _squeeze_whitespace(value):
+    return ' '.join(value.split()) if isinstance(value, str) else value
+
+
+def clean_table(df, drop_rows_without_part_number=None, source_headers=None):
+    """
+    Cleans an extracted PO table before it is written, in place of the batchClean Excel macro.
+
+    - Trims whitespace (including line breaks from wrapped cells) in headers and cells
+    - Drops rows and columns that are entirely empty
+    - Drops header rows repeated by tables that continue across pages
+    - Converts quantity and price cells to numbers, e.g. "$1,234.50" -> 1234.5; cells that are
+      not numbers (e.g. "2 EA" or "N/C") are kept as they are
+    - Optionally drops rows without a part number (batch_clean.drop_rows_without_part_number)
+
+    Args:
+        df (DataFrame): A table after replace_import_headers.
+        drop_rows_without_part_number (bool, optional): Overrides the config.yaml setting.
+        source_headers (list, optional): The vendor's headers before replace_import_headers,
+            which is what a repeated header row contains (e.g. "Qty" rather than "pu_quant").
+
+    Returns:
+        DataFrame: The cleaned table.
+    """
+    if drop_rows_without_part_number is None:
+        drop_rows_without_part_number = get_setting('batch_clean', 'drop_rows_without_part_number', False)
+    if df.empty:
+        return df
+
+    df = df.copy()
+    df.columns = [' '.join(str(column).split()) for column in df.columns]
+
+    # The names each column's header can have in a repeated header row
+    headers = [{column.lower()} for column in df.columns]
+    for names, header in zip(headers, source_headers or ()):
+        names.add(' '.join(str(header).split()).lower())
+
+    # Whitespace-only cells count as empty
+    df = df.map(_squeeze_whitespace).replace('', np.nan)
+    kept = df.notna().any().to_numpy()
+    df = df.dropna(how='all').loc[:, kept]
+    headers = [names for names, keep in zip(headers, kept) if keep]
+
+    # A row whose cells are the headers again is a repeated header row
+    repeated = sum((df.iloc[:, position].astype(str).str.lower().isin(names).to_numpy()
+                    for position, names in enumerate(headers)), np.zeros(len(df), dtype=int))
+    df = df[repeated < max(2, len(headers) // 2)]
+
+    # By position, since tables with spanned headers can repeat a column name
+    for position, column in enumerate(df.columns):
+        if column in NUMERIC_COLUMNS:
+            values = df.iloc[:, position]
+            numbers = to_number(values)
+            unparsed = numbers.isna() & values.notna()
+            df.isetitem(position, numbers.astype(object).where(~unparsed, values) if unparsed.any() else numbers)
+
+    if drop_rows_without_part_number and 'pr_codenum' in df.columns:
+        df = df[df.iloc[:, list(df.columns).index('pr_codenum')].notna()]
+
+    return df.reset_index(drop=True)
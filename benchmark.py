@@ -0,0 +1,145 @@
+#benchmark.py
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import pandas as pd
+from PyPDF2 import PdfWriter
+from azure.ai.formrecognizer import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+import settings
+import price_index
+from analysis import AnalysisPool
+from scheduler import RequestScheduler, ScheduledRetryPolicy, TokenBucket
+from fake_form_recognizer import FakeFormRecognizer, part_number
+from pipeline import Pipeline, DOC_TYPE_NAMES, document_paths
+from run_report import RunReport
+from table_output import TABLE_FORMATS
+
+# Runs the whole pipeline (split -> analyze -> header mapping -> pricing -> output -> archive)
+# over synthetic PDFs against fake_form_recognizer.py, and reports pages/second and the time
+# spent in each stage:
+#   python benchmark.py --doc-type po --documents 5 --pages 20 --concurrency 8 --latency 1.5
+
+
+def synthetic_pdf(path, pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(612, 792)
+    with open(path, 'wb') as fd:
+        writer.write(fd)
+
+
+def synthetic_lpc(path, pages, rows):
+    """
+    Writes an LPC workbook covering the part numbers the fake server returns.
+    """
+    part_numbers = [part_number(page, row) for page in range(1, pages + 1) for row in range(1, rows + 1)]
+    pd.DataFrame({
+        'pr_codenum': part_numbers,
+        'PO Cost': [round(1 + index % 97 * 0.5, 2) for index in range(len(part_numbers))],
+    }).to_excel(path, sheet_name='All', index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the processing pipeline against a fake Form Recognizer.")
+    parser.add_argument('--doc-type', choices=sorted(DOC_TYPE_NAMES), default='po')
+    parser.add_argument('--documents', type=int, default=3, help="Number of synthetic PDFs")
+    parser.add_argument('--pages', type=int, default=10, help="Pages per PDF")
+    parser.add_argument('--rows', type=int, default=20, help="Table rows and line items per page")
+    parser.add_argument('--concurrency', type=int, default=4, help="Requests in flight")
+    parser.add_argument('--requests-per-second', type=float, default=15)
+    parser.add_argument('--output-format', default='xlsx', help="Comma separated table formats")
+    parser.add_argument('--split-mode', choices=['pages', 'document'], default=settings.get_setting('analysis', 'split_mode', 'pages'))
+    parser.add_argument('--split-on-disk', action='store_true', help="Write split pages to Processed/ instead of splitting in memory")
+    parser.add_argument('--multi-page', action='store_true', help="Aggregate invoice line items")
+    parser.add_argument('--latency', type=float, default=1.0, help="Seconds the fake server takes per analysis")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of submissions answered with 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of submissions answered with 500")
+    parser.add_argument('--poll-throttle-rate', type=float, default=0.0, help="Fraction of polls answered with 429")
+    parser.add_argument('--poll-error-rate', type=float, default=0.0, help="Fraction of polls answered with 500")
+    parser.add_argument('--endpoint', help="Use an already running fake server instead of starting one")
+    parser.add_argument('--report', help="Also write the run report as JSON to this path, e.g. to compare runs")
+    parser.add_argument('--keep', action='store_true', help="Keep the working folder with the outputs")
+    args = parser.parse_args()
+
+    formats = [fmt.strip() for fmt in args.output_format.split(',')]
+    if any(fmt not in TABLE_FORMATS for fmt in formats):
+        parser.error(f"--output-format must be a comma separated list of {', '.join(TABLE_FORMATS)}")
+    doc_type = DOC_TYPE_NAMES[args.doc_type]
+
+    # Settings for this run only; config.yaml is not changed
+    settings.config.setdefault('analysis', {}).update({'split_mode': args.split_mode, 'split_in_memory': not args.split_on_disk})
+    settings.config.setdefault('output', {})['batch_workbook'] = False
+    settings.config.setdefault('pricing', {})['price_invoices'] = True  # Time pricing against the synthetic LPC
+
+    server = None
+    if args.endpoint:
+        endpoint = args.endpoint
+    else:
+        server = FakeFormRecognizer(('127.0.0.1', 0), latency=args.latency, jitter=args.jitter, rows=args.rows,
+                                    throttle_rate=args.throttle_rate, error_rate=args.error_rate, retry_after=1,
+                                    poll_throttle_rate=args.poll_throttle_rate, poll_error_rate=args.poll_error_rate).start()
+        endpoint = server.endpoint
+
+    root = tempfile.mkdtemp(prefix='pa_benchmark_')
+    try:
+        paths = document_paths(doc_type, root)
+        for path in paths.values():
+            os.makedirs(path, exist_ok=True)
+        source = os.path.join(root, 'source')
+        os.makedirs(source)
+        files = []
+        for index in range(args.documents):
+            files.append(os.path.join(source, f"bench_{index + 1:03d}.pdf"))
+            synthetic_pdf(files[-1], args.pages)
+
+        # Price against a synthetic LPC, loaded before the clock starts as it is once per process
+        price_index.LPC_PATH = os.path.join(root, 'lpc.xlsx')
+        price_index.SIDECAR_DIR = os.path.join(root, 'lpc')
+        synthetic_lpc(price_index.LPC_PATH, args.pages, args.rows)
+        price_index.get_price_index()
+
+        # No result cache or job ledger: every page must really go through the pool
+        client = DocumentAnalysisClient(endpoint, AzureKeyCredential('benchmark'), retry_policy=ScheduledRetryPolicy())
+        scheduler = RequestScheduler(TokenBucket(args.requests_per_second), backoff_base=0.5)
+        pool = AnalysisPool(client, endpoint, args.concurrency, scheduler=scheduler)
+        pipeline = Pipeline(pool, formats)
+
+        # One report covers processing and, for POs, pulling prices into the extracted tables
+        report = RunReport(doc_type)
+        with report.activate():
+            pipeline.processPDFs(files, paths, args.multi_page, doc_type)
+            if doc_type == 'Purchase Order':
+                pipeline.pullPricesFromExcel(paths['output'])
+        report.finish()
+        results = report.to_dict()
+
+        print()
+        print(f"{doc_type}: {args.documents} documents x {args.pages} pages, {args.rows} rows per page, "
+              f"concurrency {args.concurrency}, split mode {args.split_mode}")
+        print(f"Total {results['elapsed_seconds']:.2f}s  {results['pages_per_second']:.2f} pages/s")
+        print(f"Counters: {results['counters']}")
+        print()
+        print(f"{'Stage':<24}{'Seconds':>10}{'Calls':>8}")
+        for name, stage in results['stages'].items():
+            print(f"{name:<24}{stage['seconds']:>10.2f}{stage['calls']:>8}")
+        print("(Stage seconds are summed over threads, so concurrent stages can add up to more than the total.)")
+        if args.report:
+            with open(args.report, 'w') as fd:
+                json.dump(results, fd, indent=2)
+        if server is not None:
+            print(f"Server: {server.counts}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        if args.keep:
+            print(f"Outputs kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#cancellation.py
+import contextvars
+import threading
+from contextlib import contextmanager
+
+# Cooperative cancellation of a batch. Like run_report.py, the active token is a context variable,
+# so the analysis pool's worker threads see the token of the batch they work for.
+
+_active_token = contextvars.ContextVar('cancellation_token', default=None)
+
+
+class Cancelled(Exception):
+    def __init__(self, message="Cancelled", continuation_token=None):
+        """
+        Raised where a cancelled batch stops.
+
+        Args:
+            message (str): Why the work stopped.
+            continuation_token (str, optional): Restarts an abandoned Form Recognizer poller,
+                so the page is not uploaded again when the batch is resumed.
+        """
+        super().__init__(message)
+        self.continuation_token = continuation_token
+
+
+class CancellationToken:
+    def __init__(self):
+        """
+        Tells a running batch to stop: no new pages or documents are started, waits for a
+        rate limit or retry end at once, and pollers in flight are abandoned.
+        """
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def sleep(self, seconds):
+        """
+        Sleeps like time.sleep, but raises Cancelled as soon as the token is cancelled.
+        """
+        if self._event.wait(seconds):
+            raise Cancelled()
+
+    @contextmanager
+    def activate(self):
+        """
+        Makes this the token that current_token() returns in this thread and in analysis workers.
+        """
+        token = _active_token.set(self)
+        try:
+            yield self
+        finally:
+            _active_token.reset(token)
+
+
+# Returned when no batch has a token, so callers need no checks; nothing cancels it
+_never_cancelled = CancellationToken()
+
+
+def current_token():
+    """
+    Returns the token of the batch in progress, or a token that is never cancelled.
+    """
+    return _active_token.get() or _never_cancelled
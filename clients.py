@@ -0,0 +1,108 @@
+#clients.py
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from azure.ai.formrecognizer import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
+from settings import azure_settings
+from analysis import get_max_concurrency
+from scheduler import ScheduledRetryPolicy
+
+# Service types under azure_settings in config.yaml, by document type
+SERVICES = {
+    'Invoice': 'phh-invoices',
+    'Purchase Order': 'pos',
+}
+
+
+def api_key_name(service):
+    """
+    Returns the environment variable holding the API key of a service, e.g. AZURE_API_KEY_POS.
+    """
+    return f"AZURE_API_KEY_{service.upper()}"
+
+
+def get_endpoint(service):
+    if service not in azure_settings:
+        raise ValueError(f"Invalid service_type: {service}")
+    return azure_settings[service]["endpoint"]
+
+
+class ServiceClient:
+    def __init__(self, service, pool_size):
+        """
+        A DocumentAnalysisClient and the HTTP session behind it, kept for the life of the process.
+
+        The session keeps its connections (and their TLS sessions, including through a proxy)
+        open between requests and between batches. Its connection pool holds pool_size
+        connections, so every request in flight can reuse one instead of opening a new one.
+
+        Args:
+            service (str): The service type under azure_settings, e.g. "pos".
+            pool_size (int): Connections kept open to the endpoint.
+        """
+        self.service = service
+        self.endpoint = get_endpoint(service)
+        key = os.getenv(api_key_name(service))
+        if not key:
+            raise EnvironmentError(f"Azure API key for {service} not set.")
+
+        self.session = requests.Session()
+        self.pool_size = 0
+        self.resize(pool_size)
+        transport = RequestsTransport(session=self.session, session_owner=False)
+        # Throttled submissions are retried by the endpoint's RequestScheduler, see scheduler.py
+        self.client = DocumentAnalysisClient(endpoint=self.endpoint, credential=AzureKeyCredential(key),
+                                             transport=transport, retry_policy=ScheduledRetryPolicy())
+
+    def resize(self, pool_size):
+        """
+        Makes the connection pool at least pool_size connections large.
+        """
+        if pool_size <= self.pool_size:
+            return
+        # Retries are left to the Azure pipeline, as in RequestsTransport's own session
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+        )
+        for protocol in ('http://', 'https://'):
+            self.session.mount(protocol, adapter)
+        self.pool_size = pool_size
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_service_client(service, max_concurrency=None):
+    """
+    Returns the shared ServiceClient for a service type, creating it on first use.
+
+    Args:
+        service (str): The service type under azure_settings, e.g. "pos" or "phh-invoices".
+        max_concurrency (int, optional): Requests the caller keeps in flight; defaults to the
+            service's max_concurrency. The connection pool grows to fit the largest caller.
+
+    Raises:
+        ValueError: If the service is not configured.
+        EnvironmentError: If its API key is not set.
+    """
+    pool_size = max_concurrency or get_max_concurrency(service)
+    with _clients_lock:
+        if service not in _clients:
+            _clients[service] = ServiceClient(service, pool_size)
+        else:
+            _clients[service].resize(pool_size)
+        return _clients[service]
+
+
+def get_client(service, max_concurrency=None):
+    """
+    Returns the shared DocumentAnalysisClient for a service type.
+    """
+    return get_service_client(service, max_concurrency).client
@@ -0,0 +1,204 @@
+#excel_output.py
+import os
+import re
+import tempfile
+from datetime import date, datetime
+import pandas as pd
+import xlsxwriter
+
+_invalid_sheet_chars = re.compile(r'[\[\]:*?/\\]')
+
+
+def excel_value(value):
+    """
+    Converts a DataFrame cell to something xlsxwriter can write, or None for an empty cell.
+    """
+    if value is None or pd.isna(value) is True:  # None, NaN and NaT
+        return None
+    if isinstance(value, (str, bool, int, float, datetime, date)):
+        return value
+    if hasattr(value, 'item'):  # NumPy scalars
+        return excel_value(value.item())
+    return str(value)  # e.g. CurrencyValue and AddressValue from invoice fields
+
+
+class StreamingSheet:
+    def __init__(self, workbook, worksheet, columns, index):
+        """
+        A worksheet that rows are appended to as they become available.
+
+        Args:
+            workbook (StreamingWorkbook): The workbook the sheet belongs to.
+            worksheet (Worksheet): The underlying xlsxwriter worksheet.
+            columns (list): Column headers; frames written later are aligned to these.
+            index (bool): Whether the first column holds the frame's index, as with to_excel(index=True).
+        """
+        self.workbook = workbook
+        self.worksheet = worksheet
+        self.columns = list(columns)
+        self.index = index
+        self.row = 0
+        self.dropped_columns = set()
+
+        offset = 1 if index else 0
+        for column, header in enumerate(self.columns):
+            self.worksheet.write(0, column + offset, str(header), workbook.header_format)
+        self.row = 1
+
+    def write_frame(self, df):
+        """
+        Appends the rows of a DataFrame. Columns the sheet does not have are skipped.
+        """
+        extra = [column for column in df.columns if column not in self.columns]
+        if extra and not self.dropped_columns.issuperset(extra):
+            self.dropped_columns.update(extra)
+            print(f"Warning: columns {extra} are not in sheet {self.worksheet.name} and were skipped")
+
+        # Match columns by position, so a header that appears twice (e.g. two "description"
+        # columns after header mapping) fills the sheet's first and second column of that name
+        sources = {}
+        for source, column in enumerate(df.columns):
+            sources.setdefault(column, []).append(source)
+        offset = 1 if self.index else 0
+        positions = []
+        for target, column in enumerate(self.columns):
+            if sources.get(column):
+                positions.append((target + offset, sources[column].pop(0)))
+        for index_value, row in zip(df.index, df.to_numpy(dtype=object)):
+            if self.index:
+                self.worksheet.write(self.row, 0, excel_value(index_value))
+            for target, source in positions:
+                value = excel_value(row[source])
+                if value is not None:
+                    self.worksheet.write(self.row, target, value)
+            self.row += 1
+
+
+class StreamingWorkbook:
+    def __init__(self, path):
+        """
+        An xlsx workbook written in xlsxwriter's constant_memory mode.
+
+        Each row is flushed to a temporary file as soon as the next row is started, so
+        memory use does not grow with the number of rows. The workbook is assembled at
+        a temporary path of its own and moved into place on close, so a half-written file
+        is never left under the final name and workbooks opened with the same path at once
+        (e.g. the aggregates of two invoices) do not share a temporary file.
+
+        Args:
+            path (str): The final path of the workbook.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='~', suffix='.xlsx')
+        os.close(fd)
+        self.workbook = xlsxwriter.Workbook(self.temp_path, {
+            'constant_memory': True,
+            'nan_inf_to_errors': True,
+            'default_date_format': 'mm/dd/yyyy',
+        })
+        self.header_format = self.workbook.add_format({'bold': True})
+        self.sheets = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def sheet_name(self, name, suffix=''):
+        """
+        Returns a valid, unused sheet name: at most 31 characters and without []:*?/\\.
+
+        A long name is shortened before the suffix, so e.g. a document's " Details" and
+        " Items" sheets can still be told apart.
+        """
+        base = _invalid_sheet_chars.sub('_', str(name))
+        suffix = _invalid_sheet_chars.sub('_', str(suffix))[:31]
+        candidate, counter = base[:31 - len(suffix)] + suffix, 1
+        while candidate.lower() in (existing.lower() for existing in self.sheets):
+            counter += 1
+            marker = f" ({counter})"
+            candidate = base[:31 - len(marker) - len(suffix)] + marker + suffix
+        return candidate
+
+    def add_sheet(self, name, columns, index=False, suffix=''):
+        """
+        Adds a sheet with the given headers and returns it.
+        """
+        name = self.sheet_name(name, suffix)
+        sheet = StreamingSheet(self, self.workbook.add_worksheet(name), columns, index)
+        self.sheets[name] = sheet
+        return sheet
+
+    def write_frame(self, name, df, index=False, suffix=''):
+        """
+        Writes a whole DataFrame to a new sheet, like DataFrame.to_excel.
+        """
+        sheet = self.add_sheet(name, df.columns, index, suffix)
+        sheet.write_frame(df)
+        return sheet
+
+    def close(self, path=None):
+        """
+        Finishes the workbook and moves it to path (defaults to the path it was created with).
+        """
+        if self.workbook is None:
+            return
+        if not self.sheets:
+            self.workbook.add_worksheet()  # xlsx files need at least one sheet
+        self.workbook.close()
+        self.workbook = None
+        os.replace(self.temp_path, path or self.path)
+
+    def discard(self):
+        """
+        Closes the workbook without keeping it.
+        """
+        if self.workbook is None:
+            return
+        if not self.sheets:
+            self.workbook.add_worksheet()
+        self.workbook.close()
+        self.workbook = None
+        os.remove(self.temp_path)
+
+
+class AggregatedOutput:
+    def __init__(self, path, sheet_name, columns=()):
+        """
+        A single-sheet workbook that frames are appended to as they arrive.
+
+        The headers are taken from the first frame written, followed by any of columns
+        it does not have, so later frames with other standard fields still line up.
+
+        Args:
+            path (str): The path of the workbook; can be changed when closing.
+            sheet_name (str): The name of the sheet.
+            columns (iterable): Columns expected in later frames.
+        """
+        self.workbook = StreamingWorkbook(path)
+        self.sheet_name = sheet_name
+        self.columns = list(columns)
+        self.sheet = None
+        self.row_count = 0
+
+    def write_frame(self, df):
+        if self.sheet is None:
+            columns = list(df.columns) + [column for column in self.columns if column not in df.columns]
+            self.sheet = self.workbook.add_sheet(self.sheet_name, columns, index=True)
+        # Number rows across the whole aggregate, as concatenating with ignore_index would
+        df = df.set_axis(range(self.row_count, self.row_count + len(df)))
+        self.sheet.write_frame(df)
+        self.row_count += len(df)
+
+    def close(self, path=None):
+        if self.sheet is None:
+            self.sheet = self.workbook.add_sheet(self.sheet_name, [], index=True)
+        self.workbook.close(path)
+
+    def discard(self):
+        self.workbook.discard()
@@ -0,0 +1,335 @@
+#fake_form_recognizer.py
+import argparse
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from PyPDF2 import PdfReader
+
+# A local stand-in for the Form Recognizer analyze and poll endpoints, so the pipeline can be
+# run and benchmarked without Azure. Point a DocumentAnalysisClient at http://localhost:<port>/
+# with any key:
+#   python fake_form_recognizer.py --port 5050 --latency 1.5 --throttle-rate 0.05
+
+ANALYZE_PATH = re.compile(r'^/formrecognizer/documentModels/(?P<model>[^/:]+):analyze$')
+RESULT_PATH = re.compile(r'^/formrecognizer/documentModels/(?P<model>[^/]+)/analyzeResults/(?P<id>[^/]+)$')
+
+MODELS = ('prebuilt-document', 'prebuilt-invoice')
+BOX = [0, 0, 1, 0, 1, 1, 0, 1]
+
+# Vendor-style headers, so the results go through header mapping and part number detection
+TABLE_HEADERS = ['Qty', 'Deacom #', 'Description', 'Unit Price', 'Amount']
+
+
+def part_number(page_number, row):
+    return f"P{page_number % 100:02d}-{row % 1000:03d}-{(page_number * 7 + row) % 1000:03d}"
+
+
+def region(page_number):
+    return [{'pageNumber': page_number, 'polygon': BOX}]
+
+
+def table_json(page_number, rows):
+    """
+    Returns a table of the given number of rows (plus a header row) in the REST API's format.
+    """
+    grid = [TABLE_HEADERS] + [
+        [str(row % 9 + 1), part_number(page_number, row), f"Item {row} on page {page_number}",
+         f"${row % 50 + 1}.25", f"${(row % 9 + 1) * (row % 50 + 1)}.00"]
+        for row in range(1, rows + 1)
+    ]
+    cells = [
+        {
+            'kind': 'columnHeader' if row_index == 0 else 'content',
+            'rowIndex': row_index,
+            'columnIndex': column_index,
+            'content': content,
+            'boundingRegions': region(page_number),
+            'spans': [],
+        }
+        for row_index, row in enumerate(grid)
+        for column_index, content in enumerate(row)
+    ]
+    return {
+        'rowCount': len(grid),
+        'columnCount': len(TABLE_HEADERS),
+        'cells': cells,
+        'boundingRegions': region(page_number),
+        'spans': [],
+    }
+
+
+def string_field(value):
+    return {'type': 'string', 'valueString': value, 'content': value, 'confidence': 0.99}
+
+
+def number_field(value):
+    return {'type': 'number', 'valueNumber': value, 'content': str(value), 'confidence': 0.99}
+
+
+def currency_field(amount):
+    return {
+        'type': 'currency',
+        'valueCurrency': {'amount': amount, 'currencySymbol': '$', 'currencyCode': 'USD'},
+        'content': f"${amount:.2f}",
+        'confidence': 0.99,
+    }
+
+
+def invoice_json(page_number, rows):
+    """
+    Returns an invoice with the given number of line items in the REST API's format.
+    """
+    items = []
+    for row in range(1, rows + 1):
+        quantity, unit_price = row % 9 + 1, row % 50 + 1.25
+        items.append({
+            'type': 'object',
+            'valueObject': {
+                'ProductCode': string_field(part_number(page_number, row)),
+                'Description': string_field(f"Item {row} on page {page_number}"),
+                'Quantity': number_field(quantity),
+                'UnitPrice': currency_field(unit_price),
+                'Amount': currency_field(quantity * unit_price),
+            },
+            'content': f"Item {row}",
+            'confidence': 0.95,
+        })
+    return {
+        'docType': 'invoice',
+        'boundingRegions': region(page_number),
+        'fields': {
+            'VendorName': string_field('Fake Vendor Inc.'),
+            'InvoiceId': string_field(f"INV-{page_number:05d}"),
+            'InvoiceDate': {'type': 'date', 'valueDate': '2024-01-15', 'content': '01/15/2024', 'confidence': 0.99},
+            'InvoiceTotal': currency_field(sum(item['valueObject']['Amount']['valueCurrency']['amount'] for item in items)),
+            'Items': {'type': 'array', 'valueArray': items},
+        },
+        'confidence': 0.99,
+        'spans': [],
+    }
+
+
+def page_numbers(document, pages=None):
+    """
+    Returns the page numbers a request covers, from the pages parameter or the PDF itself.
+    """
+    if pages:
+        numbers = []
+        for part in pages.split(','):
+            start, _, end = part.partition('-')
+            numbers.extend(range(int(start), int(end or start) + 1))
+        return numbers
+    try:
+        return list(range(1, len(PdfReader(io.BytesIO(document)).pages) + 1))
+    except Exception:
+        return [1]
+
+
+def analyze_result(model_id, api_version, numbers, rows):
+    result = {
+        'apiVersion': api_version,
+        'modelId': model_id,
+        'stringIndexType': 'textElements',
+        'content': '',
+        'pages': [
+            {'pageNumber': number, 'angle': 0, 'width': 8.5, 'height': 11, 'unit': 'inch', 'words': [], 'lines': [], 'spans': []}
+            for number in numbers
+        ],
+        'tables': [table_json(number, rows) for number in numbers],
+    }
+    if model_id == 'prebuilt-invoice':
+        result['documents'] = [invoice_json(number, rows) for number in numbers]
+    return result
+
+
+class FakeFormRecognizer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=1.0, jitter=0.0, rows=20, poll_ms=100,
+                 throttle_rate=0.0, error_rate=0.0, failure_rate=0.0, retry_after=1,
+                 poll_throttle_rate=0.0, poll_error_rate=0.0):
+        """
+        An HTTP server answering analyze requests with canned results.
+
+        Args:
+            address (tuple): (host, port) to listen on; port 0 picks a free port.
+            latency (float): Seconds from submission until an analysis succeeds.
+            jitter (float): Up to this many seconds are added to latency at random.
+            rows (int): Table rows and invoice line items per page.
+            poll_ms (int): Polling interval suggested to the client with retry-after-ms.
+            throttle_rate (float): Fraction of submissions answered with 429 and Retry-After.
+            error_rate (float): Fraction of submissions answered with 500.
+            failure_rate (float): Fraction of analyses that end with status "failed".
+            retry_after (int): Retry-After seconds sent with a 429.
+            poll_throttle_rate (float): Fraction of polls answered with 429 and Retry-After.
+            poll_error_rate (float): Fraction of polls answered with 500.
+        """
+        super().__init__(address, FakeFormRecognizerHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.rows = rows
+        self.poll_ms = poll_ms
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        self.poll_throttle_rate = poll_throttle_rate
+        self.poll_error_rate = poll_error_rate
+        self.operations = {}
+        self.lock = threading.Lock()
+        self.counts = {'submitted': 0, 'throttled': 0, 'errors': 0, 'polls': 0, 'poll_throttled': 0, 'poll_errors': 0, 'pages': 0}
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+    def start(self):
+        """
+        Serves requests on a daemon thread and returns the server.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FakeFormRecognizerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # One line per poll would drown out the benchmark output
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('apim-request-id', str(uuid.uuid4()))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_error_json(self, status, code, message, headers=None):
+        self.send_json(status, {'error': {'code': code, 'message': message}}, headers)
+
+    def do_POST(self):
+        server = self.server
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        document = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        match = ANALYZE_PATH.match(url.path)
+        if match is None:
+            return self.send_error_json(404, 'NotFound', f"Unknown path {url.path}")
+        model_id = match.group('model')
+        if model_id not in MODELS:
+            return self.send_error_json(404, 'ModelNotFound', f"Model {model_id} is not supported by the fake server")
+
+        roll = random.random()
+        if roll < server.throttle_rate:
+            server.count('throttled')
+            return self.send_error_json(429, '429', 'Requests to the Analyze Document operation have exceeded the rate limit.',
+                                        {'Retry-After': str(server.retry_after)})
+        if roll < server.throttle_rate + server.error_rate:
+            server.count('errors')
+            return self.send_error_json(500, 'InternalServerError', 'Injected server error.')
+
+        numbers = page_numbers(document, query.get('pages'))
+        operation_id = str(uuid.uuid4())
+        with server.lock:
+            server.operations[operation_id] = {
+                'model_id': model_id,
+                'api_version': query.get('api-version', ''),
+                'numbers': numbers,
+                'created': datetime.now(timezone.utc),
+                'ready_at': time.monotonic() + server.latency + random.uniform(0, server.jitter),
+                'failed': random.random() < server.failure_rate,
+            }
+            server.counts['submitted'] += 1
+            server.counts['pages'] += len(numbers)
+
+        location = (f"{server.endpoint}formrecognizer/documentModels/{model_id}/analyzeResults/"
+                    f"{operation_id}?api-version={query.get('api-version', '')}")
+        self.send_response(202)
+        self.send_header('Operation-Location', location)
+        self.send_header('retry-after-ms', str(server.poll_ms))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        match = RESULT_PATH.match(url.path)
+        if match is None:
+            return self.send_error_json(404, 'NotFound', f"Unknown path {url.path}")
+        with server.lock:
+            operation = server.operations.get(match.group('id'))
+        if operation is None:
+            return self.send_error_json(404, 'NotFound', 'Unknown operation')
+        server.count('polls')
+
+        roll = random.random()
+        if roll < server.poll_throttle_rate:
+            server.count('poll_throttled')
+            return self.send_error_json(429, '429', 'Requests to the Get Analyze Result operation have exceeded the rate limit.',
+                                        {'Retry-After': str(server.retry_after)})
+        if roll < server.poll_throttle_rate + server.poll_error_rate:
+            server.count('poll_errors')
+            return self.send_error_json(500, 'InternalServerError', 'Injected server error.')
+
+        now = datetime.now(timezone.utc).isoformat()
+        body = {'createdDateTime': operation['created'].isoformat(), 'lastUpdatedDateTime': now}
+        if time.monotonic() < operation['ready_at']:
+            body['status'] = 'running'
+        elif operation['failed']:
+            body['status'] = 'failed'
+            body['error'] = {'code': 'InvalidRequest', 'message': 'Injected analysis failure.'}
+        else:
+            body['status'] = 'succeeded'
+            body['analyzeResult'] = analyze_result(operation['model_id'], operation['api_version'], operation['numbers'], server.rows)
+        self.send_json(200, body, {'retry-after-ms': str(server.poll_ms)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Form Recognizer endpoint for local testing.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--latency', type=float, default=1.0, help="Seconds until an analysis succeeds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random extra latency, in seconds")
+    parser.add_argument('--rows', type=int, default=20, help="Table rows and line items per page")
+    parser.add_argument('--poll-ms', type=int, default=100, help="Polling interval suggested to clients")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of submissions answered with 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of submissions answered with 500")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of analyses that fail")
+    parser.add_argument('--poll-throttle-rate', type=float, default=0.0, help="Fraction of polls answered with 429")
+    parser.add_argument('--poll-error-rate', type=float, default=0.0, help="Fraction of polls answered with 500")
+    args = parser.parse_args()
+
+    server = FakeFormRecognizer(
+        (args.host, args.port), latency=args.latency, jitter=args.jitter, rows=args.rows, poll_ms=args.poll_ms,
+        throttle_rate=args.throttle_rate, error_rate=args.error_rate, failure_rate=args.failure_rate,
+        poll_throttle_rate=args.poll_throttle_rate, poll_error_rate=args.poll_error_rate,
+    )
+    print(f"Fake Form Recognizer listening on {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Requests: {server.counts}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#header_mapping.py
+import re
+import threading
+from settings import get_setting
+
+# Used when config.yaml has no data_transformation.header_mappings section
+DEFAULT_HEADER_MAPPINGS = {
+    "order": "pu_quant",
+    "items": "pu_quant",
+    "quantity": "pu_quant",
+    "qty": "pu_quant",
+    "cost": "pu_price",
+    "unit price": "pu_price",
+    "price": "pu_price",
+    "#": "pu_price",
+}
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_header(header):
+    """
+    Lower-cases a header and collapses runs of whitespace, so "Deacom  #" becomes "deacom #".
+    """
+    return _whitespace.sub(' ', str(header)).strip().lower()
+
+
+def compact_header(header):
+    """
+    Lower-cases a header and removes all whitespace, so "deacom #" and "deacom#" compare equal.
+    """
+    return _whitespace.sub('', str(header)).lower()
+
+
+class HeaderMapper:
+    def __init__(self, mappings):
+        """
+        Maps vendor table headers to Deacom import headers.
+
+        The mappings are compiled once into two lookups: one on the normalized header and a
+        whitespace-insensitive fallback. Decisions are memoized per distinct header tuple,
+        so a vendor layout that repeats across tables is mapped with a single dict lookup.
+
+        Args:
+            mappings (dict): Vendor header -> Deacom header, e.g. data_transformation.header_mappings.
+        """
+        self.exact = {normalize_header(key): value for key, value in mappings.items()}
+        self.compact = {}
+        for key, value in mappings.items():
+            self.compact.setdefault(compact_header(key), value)
+        self._decisions = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, header):
+        """
+        Returns the Deacom header for a single vendor header, or None if it is not mapped.
+        """
+        normalized = normalize_header(header)
+        if normalized in self.exact:
+            return self.exact[normalized]
+        return self.compact.get(compact_header(normalized))
+
+    def map_headers(self, headers):
+        """
+        Maps a row of headers.
+
+        "amount" is handled by position first: as the first column it is the quantity,
+        as the last column it is the line total.
+
+        Args:
+            headers (iterable): The table's headers.
+
+        Returns:
+            list: The new headers (lower-cased, mapped where possible), or None if none of
+            the headers are recognized and the table should be left alone.
+        """
+        headers = tuple(str(header) for header in headers)
+        with self._lock:
+            if headers in self._decisions:
+                return self._decisions[headers]
+
+        new_headers = [header.lower() for header in headers]
+        recognized = False
+        for index, header in enumerate(new_headers):
+            if normalize_header(header) == 'amount':
+                recognized = True
+                if index == 0:
+                    new_headers[index] = header = 'quantity'
+                elif index == len(new_headers) - 1:
+                    new_headers[index] = 'total'
+                    continue
+            mapped = self.lookup(header)
+            if mapped is not None:
+                recognized = True
+                new_headers[index] = mapped
+
+        decision = new_headers if recognized else None
+        with self._lock:
+            self._decisions[headers] = decision
+        return decision
+
+
+# Loaded once at startup and shared by every table in the process
+header_mapper = HeaderMapper(get_setting('data_transformation', 'header_mappings', None) or DEFAULT_HEADER_MAPPINGS)
+
+
+PART_NUMBER_PATTERN = re.compile(r'P\d{2}-\d{3}-\d{3}')
+SAMPLE_ROWS = 25
+
+# Header signature -> index of the part number column found for that vendor layout
+_part_number_columns = {}
+
+
+def _column_matches(values):
+    # Plain loop so the first matching cell ends the search; non-strings can never match
+    for value in values:
+        if isinstance(value, str) and PART_NUMBER_PATTERN.match(value):
+            return True
+    return False
+
+
+def find_part_number_column(df, sample_rows=SAMPLE_ROWS):
+    """
+    Finds the column holding part numbers such as "P12-345-678".
+
+    The column found for a header layout is remembered and checked first the next time
+    the same layout is seen. Otherwise only the first sample_rows rows of each column are
+    checked, and the rest of the table is scanned only if no column matched in the sample.
+
+    Args:
+        df (DataFrame): The table to search.
+        sample_rows (int): Number of leading rows checked before falling back to a full scan.
+
+    Returns:
+        int: The position of the part number column, or None if there is none.
+    """
+    signature = tuple(str(column) for column in df.columns)
+    sample, rest = df.iloc[:sample_rows], df.iloc[sample_rows:]
+
+    cached = _part_number_columns.get(signature)
+    if cached is not None and cached < df.shape[1] and _column_matches(sample.iloc[:, cached]):
+        return cached
+
+    for rows in (sample, rest):
+        for index in range(df.shape[1]):
+            if _column_matches(rows.iloc[:, index]):
+                _part_number_columns[signature] = index
+                return index
+    return None
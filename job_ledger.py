@@ -0,0 +1,291 @@
+#job_ledger.py
+import argparse
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+from settings import get_setting, script_dir
+
+# Page states, in the order a page moves through them
+SPLIT = 'split'
+ANALYZED = 'analyzed'
+WRITTEN = 'written'
+ARCHIVED = 'archived'
+PAGE_STATES = (SPLIT, ANALYZED, WRITTEN, ARCHIVED)
+
+# Document states
+RUNNING = 'running'
+PARTIAL = 'partial'  # Some pages failed; the next run retries only those
+DONE = 'done'
+FAILED = 'failed'  # The document raised, e.g. a damaged PDF; it was moved to the Error folder
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    claimed_at REAL,
+    updated_at REAL NOT NULL,
+    UNIQUE (sha256, doc_type)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    page_number INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    error TEXT,
+    continuation_token TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (document_id, page_number)
+);
+"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fd:
+        for block in iter(lambda: fd.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_worker():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobLedger:
+    def __init__(self, path, claim_timeout=900, worker=None):
+        """
+        SQLite ledger of the documents and pages processed by the pipeline.
+
+        A document is identified by the SHA-256 of the PDF and its document type, so the
+        same file dropped twice, or left behind by a crashed run, is recognized. Each page
+        records how far it got (split, analyzed, written, archived); a restarted run skips
+        pages that were already written instead of sending them to Azure again.
+
+        Several processes can share one ledger: a document is claimed by one worker at a
+        time, and a claim that has not been refreshed for claim_timeout seconds is treated
+        as abandoned by a crashed worker and can be taken over.
+
+        Args:
+            path (str): The SQLite database file.
+            claim_timeout (float): Seconds after which another worker may take over a claim.
+            worker (str, optional): Name of this worker; defaults to host:pid.
+        """
+        self.path = path
+        self.claim_timeout = claim_timeout
+        self.worker = worker or default_worker()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        columns = {row['name'] for row in connection.execute("PRAGMA table_info(pages)")}
+        if 'continuation_token' not in columns:  # Ledgers created before cancellation was added
+            connection.execute("ALTER TABLE pages ADD COLUMN continuation_token TEXT")
+
+    def _connection(self):
+        # One connection per thread; WAL lets readers and a writer work at the same time
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA foreign_keys=ON')
+            self._local.connection = connection
+        return connection
+
+    def _connect(self):
+        return _Transaction(self._connection())
+
+    def claim(self, file_path, doc_type, reprocess=False):
+        """
+        Claims a document for this worker.
+
+        Args:
+            file_path (str): The PDF.
+            doc_type (str): 'Invoice' or 'Purchase Order'.
+            reprocess (bool): Claim a document that is already done, and forget its pages so
+                every page is processed again.
+
+        Returns:
+            sqlite3.Row: The document (id, name, state, ...), or None if it is already done
+            (unless reprocess is set) or another worker holds a live claim on it.
+        """
+        sha256 = file_sha256(file_path)
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO documents (sha256, doc_type, name, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, doc_type, os.path.basename(file_path), PARTIAL, now))
+            document = connection.execute(
+                "SELECT * FROM documents WHERE sha256 = ? AND doc_type = ?", (sha256, doc_type)).fetchone()
+            if document['state'] == DONE and not reprocess:
+                return None
+            if (document['state'] == RUNNING and document['worker'] != self.worker
+                    and now - document['claimed_at'] < self.claim_timeout):
+                return None
+            if document['state'] == DONE:
+                connection.execute("DELETE FROM pages WHERE document_id = ?", (document['id'],))
+            connection.execute(
+                "UPDATE documents SET state = ?, worker = ?, claimed_at = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, self.worker, now, now, document['id']))
+            return connection.execute("SELECT * FROM documents WHERE id = ?", (document['id'],)).fetchone()
+
+    def page_states(self, document_id):
+        """
+        Returns {page_number: state} for the pages recorded for a document.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT page_number, state FROM pages WHERE document_id = ?", (document_id,)).fetchall()
+        return {row['page_number']: row['state'] for row in rows}
+
+    def continuation_tokens(self, document_id):
+        """
+        Returns {page name: continuation token} for pages whose analysis was abandoned by a cancelled batch.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT name, continuation_token FROM pages WHERE document_id = ? AND continuation_token IS NOT NULL",
+                (document_id,)).fetchall()
+        return {row['name']: row['continuation_token'] for row in rows}
+
+    def mark_page(self, document_id, page, state, error=None, continuation_token=None):
+        """
+        Records the state of a page and refreshes the document's claim.
+
+        Args:
+            document_id (int): The document's id from claim().
+            page (Page): The page.
+            state (str): One of PAGE_STATES.
+            error (str, optional): Why the page did not get further.
+            continuation_token (str, optional): Resumes the page's abandoned analysis; cleared by the next state.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO pages (document_id, page_number, name, state, error, continuation_token, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (document_id, page_number) DO UPDATE SET state = excluded.state, error = excluded.error, "
+                "continuation_token = excluded.continuation_token, updated_at = excluded.updated_at",
+                (document_id, page.page_number, page.name, state, error, continuation_token, now))
+            connection.execute(
+                "UPDATE documents SET claimed_at = ?, updated_at = ? WHERE id = ? AND worker = ?",
+                (now, now, document_id, self.worker))
+
+    def finish(self, document_id):
+        """
+        Releases a document: DONE if every recorded page was written, otherwise PARTIAL.
+
+        Returns:
+            str: The document's new state.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            incomplete = connection.execute(
+                "SELECT COUNT(*) FROM pages WHERE document_id = ? AND state IN (?, ?)",
+                (document_id, SPLIT, ANALYZED)).fetchone()[0]
+            state = PARTIAL if incomplete else DONE
+            connection.execute(
+                "UPDATE documents SET state = ?, worker = NULL, claimed_at = NULL, updated_at = ? WHERE id = ?",
+                (state, now, document_id))
+        return state
+
+    def release(self, document_id, state=PARTIAL):
+        """
+        Gives up a claim without finishing, e.g. when cancelled, so the document can be resumed.
+
+        Args:
+            document_id (int): The claimed document.
+            state (str): PARTIAL, or FAILED for a document that raised. Either can be claimed again.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE documents SET state = ?, worker = NULL, claimed_at = NULL, updated_at = ? WHERE id = ? AND worker = ?",
+                (state, time.time(), document_id, self.worker))
+
+    def documents(self, state=None):
+        """
+        Returns the documents in the ledger, most recently updated first, with page counts by state.
+        """
+        query = (
+            "SELECT d.*, "
+            + ", ".join(f"SUM(p.state = '{page_state}') AS {page_state}" for page_state in PAGE_STATES)
+            + " FROM documents d LEFT JOIN pages p ON p.document_id = d.id"
+            + (" WHERE d.state = ?" if state else "")
+            + " GROUP BY d.id ORDER BY d.updated_at DESC"
+        )
+        with self._connect() as connection:
+            return connection.execute(query, (state,) if state else ()).fetchall()
+
+    def forget(self, name):
+        """
+        Removes documents by file name, so they are processed again from scratch.
+
+        Returns:
+            int: The number of documents removed.
+        """
+        with self._connect() as connection:
+            return connection.execute("DELETE FROM documents WHERE name = ?", (name,)).rowcount
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot claim the same document
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+_shared_ledger = None
+_shared_ledger_lock = threading.Lock()
+
+
+def ledger_path():
+    return os.path.join(script_dir, get_setting('job_ledger', 'path', 'cache/jobs.sqlite3'))
+
+
+def get_job_ledger():
+    """
+    Returns the ledger configured under job_ledger in config.yaml, or None if it is disabled.
+    """
+    global _shared_ledger
+    if not get_setting('job_ledger', 'enabled', False):
+        return None
+    with _shared_ledger_lock:
+        if _shared_ledger is None:
+            _shared_ledger = JobLedger(ledger_path(), get_setting('job_ledger', 'claim_timeout_seconds', 900))
+        return _shared_ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the job ledger of processed documents.")
+    parser.add_argument('command', choices=['list', 'forget'])
+    parser.add_argument('name', nargs='?', help="File name of the document to forget")
+    parser.add_argument('--state', choices=[RUNNING, PARTIAL, DONE, FAILED], help="Only list documents in this state")
+    args = parser.parse_args()
+
+    ledger = JobLedger(ledger_path())
+    if args.command == 'list':
+        for document in ledger.documents(args.state):
+            counts = ' '.join(f"{page_state}={document[page_state] or 0}" for page_state in PAGE_STATES)
+            updated = time.strftime('%Y-%m-%d %H:%M', time.localtime(document['updated_at']))
+            print(f"{updated}  {document['state']:<8} {document['doc_type']:<15} {document['name']}  {counts}")
+    else:
+        if not args.name:
+            parser.error("forget needs the file name of a document")
+        print(f"Removed {ledger.forget(args.name)} documents.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#line_items.py
+import pandas as pd
+
+# Line item fields returned by the prebuilt-invoice model, plus the columns added by pricing
+ITEM_COLUMNS = [
+    'Description', 'ProductCode', 'Quantity', 'Unit', 'UnitPrice', 'Amount', 'Date', 'Tax', 'TaxRate', 'PO Cost',
+]
+
+
+class LineItemAccumulator:
+    def __init__(self, sink=None):
+        """
+        Collects invoice line items for the multi-page aggregate.
+
+        Pages can be added in any order; each page's frames are kept as-is and the
+        aggregate is built with a single concat in page order when it is needed, so the
+        cost of adding a page does not grow with the number of pages already collected.
+
+        With a sink (e.g. an AggregatedOutput), frames are instead written to it as soon
+        as every earlier page has arrived, and only out-of-order pages are held in memory.
+        Positions must then be 0, 1, 2, ... and every position must be added or skipped.
+
+        Args:
+            sink (optional): An object with a write_frame(df) method.
+        """
+        self._pages = {}
+        self.sink = sink
+        self.next_position = 0
+        self.row_count = 0
+
+    def __len__(self):
+        return len(self._pages)
+
+    def add(self, position, line_items_dfs):
+        """
+        Adds the line item frames of one page.
+
+        Args:
+            position: Sort key of the page within the document, e.g. its index.
+            line_items_dfs (list): The page's line item DataFrames; empty frames are skipped.
+        """
+        frames = [df for df in line_items_dfs if not df.empty]
+        self._pages[position] = frames
+        self.row_count += sum(len(df) for df in frames)
+        self._flush()
+
+    def skip(self, position):
+        """
+        Marks a page that has no line items (or failed), so later pages can be written.
+        """
+        self.add(position, [])
+
+    def _flush(self):
+        if self.sink is None:
+            return
+        while self.next_position in self._pages:
+            for df in self._pages.pop(self.next_position):
+                self.sink.write_frame(df)
+            self.next_position += 1
+
+    def close(self):
+        """
+        Writes any pages still held back (e.g. after a gap left by a missing page) to the sink.
+        """
+        if self.sink is None:
+            return
+        for position in sorted(self._pages):
+            for df in self._pages.pop(position):
+                self.sink.write_frame(df)
+
+    def frame(self):
+        """
+        Returns all collected line items in page order as one DataFrame (without a sink).
+        """
+        frames = [df for position in sorted(self._pages) for df in self._pages[position]]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,100 @@
+#pa_batch.py
+import argparse
+import glob
+import os
+import sys
+from pipeline import Pipeline, DOC_TYPE_NAMES, document_paths
+from table_output import TABLE_FORMATS
+from watch_folder import create_watcher
+
+# Runs the same processing as the PDF_ProcV3 GUI without a display, e.g. from a scheduled task:
+#   python pa_batch.py --doc-type po --concurrency 8 --output-format xlsx,parquet "C:/Scans/*.pdf"
+
+def expand_inputs(inputs):
+    """
+    Expands folders and glob patterns to the PDF files they contain.
+
+    Args:
+        inputs (list): File paths, folders or glob patterns.
+
+    Returns:
+        list: PDF paths in the order given, without duplicates.
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, '*.pdf')))
+        else:
+            matches = sorted(glob.glob(item)) or [item]  # A missing file is reported by processPDFs
+        for path in matches:
+            if path not in files:
+                files.append(path)
+    return files
+
+
+def output_formats(value):
+    """
+    Parses a comma separated list of output formats for argparse.
+    """
+    formats = [fmt.strip().lower() for fmt in value.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in TABLE_FORMATS]
+    if not formats or unknown:
+        raise argparse.ArgumentTypeError(f"expected a comma separated list of {', '.join(TABLE_FORMATS)}")
+    return formats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process invoice or purchase order PDFs without the GUI.")
+    parser.add_argument('inputs', nargs='*', help="PDF files, folders or glob patterns; with --watch, the folder to watch")
+    parser.add_argument('--doc-type', required=True, choices=sorted(DOC_TYPE_NAMES), help="Type of the documents")
+    parser.add_argument('--concurrency', type=int, help="Concurrent Form Recognizer requests (defaults to max_concurrency from config.yaml)")
+    parser.add_argument('--output-format', type=output_formats, help="Comma separated table formats (defaults to output.table_formats)")
+    parser.add_argument('--multi-page', action='store_true', help="Treat the pages of each invoice as one document")
+    parser.add_argument('--watch', action='store_true', help="Keep running and process PDFs as they are dropped into the folder")
+    parser.add_argument('--reprocess', action='store_true', help="Process documents the job ledger has as done again instead of skipping them")
+    parser.add_argument('--recover', action='store_true', help="First analyze pages left in the Processed folder by an interrupted run")
+    parser.add_argument('--base-path', help="Folder holding the Invoices/ and Purchase Orders/ trees")
+    args = parser.parse_args(argv)
+
+    if args.concurrency is not None and args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    doc_type = DOC_TYPE_NAMES[args.doc_type]
+    if args.watch:
+        if len(args.inputs) > 1:
+            parser.error("--watch takes at most one folder")
+        folder = args.inputs[0] if args.inputs else None
+        create_watcher(doc_type, folder, max_concurrency=args.concurrency, multi_page=args.multi_page,
+                       formats=args.output_format, root=args.base_path).run()
+        return 0
+    if not args.inputs and not args.recover:
+        parser.error("no input files given")
+
+    files = expand_inputs(args.inputs)
+    if not files and not args.recover:
+        print("No PDF files found.")
+        return 1
+
+    paths = document_paths(doc_type, args.base_path)
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+
+    pipeline = Pipeline.for_doc_type(doc_type, args.concurrency, args.output_format)
+    if args.recover:
+        pipeline.recover_processed(paths, args.multi_page, doc_type)
+        if not files:
+            return 0
+    print(f"Processing {len(files)} {doc_type} file(s)...")
+    skipped = pipeline.processPDFs(files, paths, args.multi_page, doc_type, reprocess=args.reprocess)
+    print(f"{doc_type} files have been processed. Output: {paths['output']}")
+    failed = pipeline.last_report.counters.get('failed_documents', 0)
+    if failed:
+        print(f"{failed} file(s) failed and were moved to {paths['error']}")
+    if skipped:
+        print(f"Skipped {len(skipped)} file(s) already processed or claimed by another worker "
+              f"(add --reprocess to process them again): {', '.join(os.path.basename(path) for path in skipped)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
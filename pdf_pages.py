@@ -0,0 +1,58 @@
+#pdf_pages.py
+import io
+import mmap
+import os
+from collections import namedtuple
+from PyPDF2 import PdfReader, PdfWriter
+
+# A single page ready for analysis. data holds the page as a one-page PDF; path is set
+# instead when the page already exists on disk (e.g. split files left in Processed/).
+Page = namedtuple('Page', ['name', 'page_number', 'data', 'path'])
+
+
+def iter_pdf_pages(source, name=None):
+    """
+    Splits a PDF into single-page PDFs in memory.
+
+    The source file is memory-mapped rather than read, and each page is written to an
+    in-memory buffer, so nothing is written to disk while splitting.
+
+    Args:
+        source (str or bytes): The path to the PDF, or its content.
+        name (str, optional): Base name for the pages; defaults to the file name without extension.
+
+    Yields:
+        Page: One page at a time, named "<name>_<page number>" like the files split_pdf writes.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        yield from _split_stream(io.BytesIO(source), name or "document")
+        return
+
+    name = name or os.path.splitext(os.path.basename(source))[0]
+    with open(source, "rb") as fd:
+        if os.fstat(fd.fileno()).st_size == 0:
+            # mmap cannot map an empty file; let PdfReader raise its usual error
+            yield from _split_stream(fd, name)
+            return
+        with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from _split_stream(mapped, name)
+
+
+def _split_stream(stream, name):
+    pdf = PdfReader(stream)
+    for i, page in enumerate(pdf.pages):
+        pdf_writer = PdfWriter()
+        pdf_writer.add_page(page)
+        buffer = io.BytesIO()
+        pdf_writer.write(buffer)
+        yield Page(f"{name}_{i + 1}", i + 1, buffer.getvalue(), None)
+
+
+def read_page(page):
+    """
+    Returns the content of a page, reading it from disk if it was not split in memory.
+    """
+    if page.data is not None:
+        return page.data
+    with open(page.path, "rb") as fd:
+        return fd.read()
@@ -0,0 +1,802 @@
+#pipeline.py
+import os
+import io
+import shutil
+import traceback
+import pandas as pd
+from PyPDF2 import PdfReader
+from azure.ai.formrecognizer import DocumentField
+from datetime import datetime
+from settings import get_setting
+from analysis import AnalysisPool, get_max_concurrency, page_ranges, first_page, tables_by_page
+from result_cache import get_result_cache
+from clients import SERVICES, get_service_client
+from scheduler import get_scheduler
+from run_report import RunReport, active_report, current_report
+from cancellation import Cancelled, current_token
+from job_ledger import get_job_ledger, SPLIT, ANALYZED, WRITTEN, ARCHIVED, DONE, FAILED
+import progress
+from pdf_pages import Page, iter_pdf_pages
+from price_index import get_price_index
+from header_mapping import header_mapper, find_part_number_column
+from tables import table_grid, table_frame
+from line_items import LineItemAccumulator, ITEM_COLUMNS
+from excel_output import StreamingWorkbook, AggregatedOutput
+from table_output import write_table, read_table, list_tables, table_formats
+from batch_clean import clean_table
+
+# The processing pipeline shared by the GUI (PDF_ProcV3.py) and the headless runner (pa_batch.py).
+# Nothing here may import PyQt5 or win32com.
+
+# Azure credentials and paths
+
+base_path = "C:/Users/daniel.pace/Documents/Coding/PO Automation/Azure/"
+
+# Command-line names of the document types (pa_batch.py, watch_folder.py)
+DOC_TYPE_NAMES = {'invoice': 'Invoice', 'po': 'Purchase Order'}
+
+
+def document_paths(doc_type, root=None):
+    """
+    Returns the input, processed, output and archive directories for a document type.
+
+    Args:
+        doc_type (str): 'Invoice' or 'Purchase Order'.
+        root (str, optional): Folder holding the "Invoices/" and "Purchase Orders/" trees; defaults to base_path.
+    """
+    root = root or base_path
+    if doc_type == 'Invoice':
+        base_doc_path = os.path.join(root, "Invoices/")
+    else:  # Purchase Order
+        base_doc_path = os.path.join(root, "Purchase Orders/")
+
+    return {
+        'input': os.path.join(base_doc_path, 'Input/'),
+        'processed': os.path.join(base_doc_path, 'Processed/'),
+        'output': os.path.join(base_doc_path, 'Output/'),
+        'archive_input': os.path.join(base_doc_path, 'Input/Archive/'),
+        'archive_processed': os.path.join(base_doc_path, 'Processed/Archive/'),
+        'error': os.path.join(base_doc_path, 'Input/Error/')
+    }
+
+
+def page_sort_key(file_name):
+    """
+    Sort key that orders split pages ("name_1.pdf", "name_2.pdf", ..., "name_10.pdf") by page number.
+    """
+    stem = os.path.splitext(file_name)[0]
+    name, _, page = stem.rpartition('_')
+    return (name, int(page)) if page.isdigit() else (stem, 0)
+
+
+class Pipeline:
+    def __init__(self, analysis_pool=None, formats=None, ledger=None):
+        """
+        Splits, analyzes and writes out PDFs.
+
+        Args:
+            analysis_pool (AnalysisPool, optional): Pool used for Form Recognizer requests; not
+                needed for pullPricesFromExcel.
+            formats (list, optional): Output formats for tables; defaults to output.table_formats.
+            ledger (JobLedger, optional): Records the progress of each document and page so an
+                interrupted run resumes where it stopped.
+        """
+        self.analysis_pool = analysis_pool
+        self.client = analysis_pool.client if analysis_pool is not None else None
+        self.formats = formats or table_formats()
+        self.ledger = ledger
+        self.last_report = None
+        self.lpc_error = None  # Why invoice line items are not priced in this run, reported once
+
+    @classmethod
+    def for_doc_type(cls, doc_type, max_concurrency=None, formats=None):
+        """
+        Creates a pipeline using the shared client for the endpoint of a document type.
+
+        Args:
+            doc_type (str): 'Invoice' or 'Purchase Order'.
+            max_concurrency (int, optional): Overrides max_concurrency from config.yaml.
+            formats (list, optional): Output formats for tables.
+        """
+        service = SERVICES[doc_type]
+        max_concurrency = max_concurrency or get_max_concurrency(service)
+
+        # The client and its connections are shared by every pipeline for the service
+        service_client = get_service_client(service, max_concurrency)
+        analysis_pool = AnalysisPool(
+            service_client.client, service_client.endpoint, max_concurrency,
+            cache=get_result_cache(), scheduler=get_scheduler(service, service_client.endpoint))
+        return cls(analysis_pool, formats, get_job_ledger())
+
+    def processPDFs(self, files, paths, multi_page, doc_type, reprocess=False):
+        """
+        Process a list of PDF files based on the document type.
+
+        Args:
+            files (list): A list of file paths to the PDF files.
+            paths (dict): A dictionary containing the paths for input, processed, output, and archive directories.
+            reprocess (bool): Process documents the job ledger has as done again, instead of skipping them.
+
+        Returns:
+            list: Files skipped because the job ledger has them as done or claimed by another worker.
+
+        A run report with the time spent in each stage is written to the output directory and
+        kept in self.last_report, unless the caller already has a report active (see run_report.py).
+        """
+        if active_report() is not None:
+            return self._process_files(files, paths, multi_page, doc_type, reprocess)
+
+        report = RunReport(doc_type)
+        with report.activate():
+            skipped = self._process_files(files, paths, multi_page, doc_type, reprocess)
+        report.finish()
+        self.last_report = report
+        print(f"Run report: {report.write(paths['output'])}")
+        print(report.summary())
+        return skipped
+
+    def _process_files(self, files, paths, multi_page, doc_type, reprocess=False):
+        report = current_report()
+        cancel = current_token()
+        self.lpc_error = None  # The LPC may have become available since the last run
+
+        # With output.batch_workbook, every document of this run goes into one workbook
+        output = self.open_document_output(paths, doc_type)
+        skipped = []
+
+        for file_path in files:
+            progress.emit(progress.QUEUED, document=os.path.basename(file_path))
+    
+        try:
+            for file_path in files:
+                if cancel.cancelled:
+                    # Left where they are, unclaimed, for the next run
+                    progress.emit(progress.CANCELLED, document=os.path.basename(file_path))
+                    continue
+
+                if not os.path.exists(file_path):
+                    self.log_errors([f"File not found: {file_path}"])
+                    progress.emit(progress.FAILED, error="File not found", document=os.path.basename(file_path))
+                    continue
+
+                # Extract filename for use in paths
+                filename = os.path.basename(file_path)
+
+                # Documents already processed, or being processed by another worker, are left alone
+                job = self.ledger.claim(file_path, doc_type, reprocess) if self.ledger is not None else None
+                if self.ledger is not None and job is None:
+                    print(f"Skipping {filename}: already processed or claimed by another worker (see job_ledger.py)")
+                    skipped.append(file_path)
+                    report.count('skipped_documents')
+                    progress.emit(progress.SKIPPED, error="Already processed or claimed by another worker", document=filename)
+                    continue
+
+                with progress.document(filename):
+                    try:
+                        self.process_file(file_path, paths, multi_page, doc_type, output, job)
+                        report.count('documents')
+                    except Cancelled:
+                        if job is not None:
+                            self.ledger.release(job['id'])
+                        print(f"{filename}: cancelled; pages that were not written will be analyzed by the next run")
+                        progress.emit(progress.CANCELLED)
+                        continue
+                    except Exception as e:
+                        # One bad document, e.g. a damaged PDF, must not stop the rest of the batch
+                        traceback.print_exc()
+                        self.log_errors([f"{filename} failed and was moved to {paths['error']}: {e}"])
+                        if job is not None:
+                            self.ledger.release(job['id'], FAILED)
+                        report.count('failed_documents')
+                        self.move_to_error(filename, paths)
+                        progress.emit(progress.FAILED, error=str(e) or type(e).__name__)
+                        continue
+                    except BaseException as e:
+                        if job is not None:
+                            self.ledger.release(job['id'])
+                        progress.emit(progress.FAILED, error=str(e) or type(e).__name__)
+                        raise
+                    state = self.ledger.finish(job['id']) if job is not None else DONE
+                    if state != DONE:
+                        print(f"{filename}: some pages failed; processing it again retries only those pages")
+                    progress.emit(progress.DONE, error=None if state == DONE else "Some pages failed")
+        finally:
+            # Also when a document raises, so the documents finished so far are kept and no temporary file is left open
+            if output is not None:
+                with report.stage('output'):
+                    output.close()
+        return skipped
+
+    def move_to_error(self, filename, paths):
+        """
+        Moves the input copy of a document that failed to the error folder, so it is not picked up again.
+        """
+        input_file = os.path.join(paths['input'], filename)
+        if os.path.exists(input_file):
+            os.makedirs(paths['error'], exist_ok=True)
+            shutil.move(input_file, os.path.join(paths['error'], filename))
+
+    def process_file(self, file_path, paths, multi_page, doc_type, output=None, job=None):
+        """
+        Copies one PDF to the input directory, splits and analyzes it, and archives it.
+        """
+        filename = os.path.basename(file_path)
+
+        # Debug: Print paths to verify
+        print(f"Copying from: {file_path}")
+        print(f"Copying to: {os.path.join(paths['input'], filename)}")
+
+        # Step 1: Copy file to the 'input' directory, unless it was dropped there (see watch_folder.py)
+        input_file = os.path.join(paths['input'], filename)
+        if not (os.path.exists(input_file) and os.path.samefile(file_path, input_file)):
+            with current_report().stage('copy input'):
+                shutil.copy(file_path, input_file)
+
+        if get_setting('analysis', 'split_mode', 'pages') == 'document':
+            # Steps 2-3: Send the original PDF in page ranges and map results back to pages
+            self.analyze_document_ranges(input_file, paths, multi_page, doc_type, output, job)
+        else:
+            # Step 2: Split PDF
+            pages = self.split_pages(input_file, paths)
+
+            # Step 3: Analyze documents based on the document type
+            if doc_type == 'Invoice':
+                self.process_invoices(paths, multi_page, pages, output, job)
+            elif doc_type == 'Purchase Order':
+                self.analyze_general_documents(paths, pages, job)
+
+        # Step 4: Move original file to 'archive_input'
+        with current_report().stage('archive'):
+            shutil.move(input_file, os.path.join(paths['archive_input'], filename))
+
+        # Note: Moving processed files to 'archive_processed' should be handled within the respective processing functions
+
+    def split_pages(self, file_path, paths):
+        """
+        Returns the pages of a PDF for analysis: split lazily in memory, or written to the
+        processed directory when analysis.split_in_memory is off.
+        """
+        report = current_report()
+        if get_setting('analysis', 'split_in_memory', True):
+            # Pages are split lazily and handed straight to the analysis pool
+            return report.iterate('split', iter_pdf_pages(file_path))
+        # Only the pages split from this file are analyzed, not everything in Processed/
+        with report.stage('split'):
+            return self.split_pdf(file_path, paths)
+
+    def split_pdf(self, file_path, paths):
+        """
+        Splits a PDF file into multiple pages.
+
+        Parameters:
+            file_path (str): The path to the PDF file to be split.
+            paths (dict): A dictionary containing the paths for processed files.
+
+        Returns:
+            list: The split pages, as Pages whose path is the file written to the processed directory.
+        """
+        # Ensure the path points to a file
+        if not file_path.endswith(".pdf"):
+            print(f"Error: {file_path} is not a PDF file.")
+            return []
+
+        pages = []
+        for page in iter_pdf_pages(file_path):
+            # Construct output filename for each page
+            output_filepath = os.path.join(paths['processed'], f"{page.name}.pdf")
+
+            # Write out each page as a separate PDF
+            with open(output_filepath, 'wb') as out:
+                out.write(page.data)
+            pages.append(page._replace(data=None, path=output_filepath))
+        return pages
+
+    def extract_table_data(self, table):
+        return table_grid(table)
+
+    def extract_invoice_data(self, file_path):
+        """Extract invoice data using Azure Form Recognizer"""
+        
+        errors = []
+        invoice_data = None
+        
+        try:
+            with open(file_path, "rb") as fd:
+                document = fd.read()
+
+            result = self.analysis_pool.analyze("prebuilt-invoice", document)
+            invoice_data = self.invoice_fields(result)
+
+        except Exception as e:
+            errors.append(f"Error processing {file_path}: {e}")
+            
+        if errors:
+            self.log_errors(errors)
+            
+        return invoice_data
+
+    def invoice_fields(self, result):
+        """Return the fields of the first invoice in an analysis result"""
+        if not result.documents:
+            return None
+        return result.documents[0].fields
+
+    def log_errors(self, errors):
+        """Print errors collected while processing"""
+        for error in errors:
+            print(error)
+
+    def invoice_dfs(self, invoice_data_list):
+        """Convert extracted invoice data into DataFrames"""
+        with current_report().stage('invoice fields'):
+            return self._invoice_dfs(invoice_data_list)
+
+    def _invoice_dfs(self, invoice_data_list):
+        all_data_dfs = []
+        line_items_dfs = []
+
+        for invoice_data in invoice_data_list:
+            
+            all_data = {key: value.value if isinstance(value, DocumentField) else value
+                        for key, value in invoice_data.items() if key != 'Items'}
+                        
+            all_data_df = pd.DataFrame([all_data])
+            all_data_dfs.append(all_data_df)
+                
+            if 'Items' in invoice_data:
+                line_items = []
+                for item in invoice_data['Items'].value:
+                    line_item = {key: value.value if isinstance(value, DocumentField) else value
+                                for key, value in item.value.items()}
+                    line_items.append(line_item)
+                        
+                line_items_df = self.price_line_items(pd.DataFrame(line_items))
+                line_items_df.index = range(1, len(line_items_df) + 1)
+                line_items_dfs.append(line_items_df)
+            else:
+                # If 'Items' key is not present, add an empty DataFrame
+                line_items_dfs.append(pd.DataFrame())
+
+        return all_data_dfs, line_items_dfs
+
+    def price_line_items(self, line_items_df):
+        """Add LPC prices to invoice line items by product code"""
+        if not get_setting('pricing', 'price_invoices', False) or 'ProductCode' not in line_items_df.columns:
+            return line_items_df
+        if self.lpc_error is not None:
+            return line_items_df  # Already reported for this run
+        try:
+            with current_report().stage('pricing'):
+                return get_price_index().price(line_items_df, column='ProductCode')
+        except (OSError, ValueError) as e:
+            if self.lpc_error is None:
+                self.lpc_error = e
+                print(f"Warning: invoice line items are not priced in this run, the LPC could not be loaded: {e}")
+            return line_items_df
+
+    def process_invoices(self, paths, multi_page, pages, output=None, job=None):
+        # The aggregate needs every page, so multi-page runs only skip pages when nothing is aggregated
+        pages = self.pending_pages(pages, paths, job, resume=not multi_page)
+        analyzed_pages = {}
+        written_pages = set()
+        errors = []
+
+        # Line items are streamed into the aggregated workbook in page order as pages complete
+        aggregate = self.open_aggregated_output('invoices', paths) if multi_page else None
+        line_items = LineItemAccumulator(aggregate)
+
+        report = current_report()
+
+        # Invoices are extracted concurrently and saved in the order they complete
+        returned = 0
+        for index, page, result, error in self.analysis_pool.analyze_pages("prebuilt-invoice", pages, self.continuation_tokens(job)):
+            if isinstance(error, Cancelled):
+                self.return_page(job, page, error)
+                returned += 1
+                line_items.skip(index)
+                continue
+            analyzed_pages[index] = page
+            report.count('pages')
+            if error is not None:
+                errors.append(f"Error processing {page.name}: {error}")
+                report.count('errors')
+                self.mark_page(job, page, SPLIT, str(error))
+                progress.emit(progress.FAILED, page.name, str(error))
+                line_items.skip(index)
+                continue
+            self.mark_page(job, page, ANALYZED)
+
+            outputs = []
+            invoice_data = self.invoice_fields(result)
+            if invoice_data:
+                all_data_dfs, line_items_dfs = self.invoice_dfs([invoice_data])
+
+                for all_data_df, line_items_df in zip(all_data_dfs, line_items_dfs):
+                    outputs += self.save_document_output(all_data_df, line_items_df, page.name, 'Invoice', paths, output)
+
+                if multi_page:
+                    with report.stage('output'):
+                        line_items.add(index, line_items_dfs)
+            else:
+                line_items.skip(index)
+            self.mark_page(job, page, WRITTEN)
+            progress.emit(progress.WRITTEN, page.name, outputs=outputs)
+            written_pages.add(index)
+
+        if errors:
+            self.log_errors(errors)
+
+        if aggregate is not None:
+            with report.stage('output'):
+                line_items.close()
+                if analyzed_pages and not returned:
+                    aggregate_path = os.path.join(paths['output'], f"{analyzed_pages[max(analyzed_pages)].name}_aggregated.xlsx")
+                    aggregate.close(aggregate_path)
+                    progress.record_output(aggregate_path)
+                else:
+                    aggregate.discard()
+
+        # Move pages to archive_processed
+        for index in sorted(analyzed_pages):
+            self.archive_page(analyzed_pages[index], paths)
+            if index in written_pages:
+                self.mark_page(job, analyzed_pages[index], ARCHIVED)
+
+        if returned:
+            raise Cancelled(f"{returned} page(s) returned to the queue")
+
+    def analyze_general_documents(self, paths, pages, job=None):
+        """
+        Analyze general documents such as purchase orders.
+
+        Args:
+            paths (dict): A dictionary containing the paths for input, processed, output, and archive directories.
+            pages (iterable): Pages to analyze, from iter_pdf_pages or split_pdf.
+            job (sqlite3.Row, optional): The document's entry in the job ledger.
+        """
+        pages = self.pending_pages(pages, paths, job)
+
+        report = current_report()
+
+        # Pages are analyzed concurrently; each result is written as soon as it arrives
+        returned = 0
+        for _, page, result, error in self.analysis_pool.analyze_pages("prebuilt-document", pages, self.continuation_tokens(job)):
+            if isinstance(error, Cancelled):
+                self.return_page(job, page, error)
+                returned += 1
+                continue
+            report.count('pages')
+            if error is not None:
+                print(f"Error processing {page.name}: {error}")
+                report.count('errors')
+                self.mark_page(job, page, SPLIT, str(error))
+                progress.emit(progress.FAILED, page.name, str(error))
+                continue
+            self.mark_page(job, page, ANALYZED)
+            report.count('tables', len(result.tables))
+            outputs = []
+            for i, table in enumerate(result.tables):
+                outputs += self.save_table_output(table, f"{page.name}_table_{i}", paths)
+            self.mark_page(job, page, WRITTEN)
+            progress.emit(progress.WRITTEN, page.name, outputs=outputs)
+            
+            self.archive_page(page, paths)
+            self.mark_page(job, page, ARCHIVED)
+
+        if returned:
+            raise Cancelled(f"{returned} page(s) returned to the queue")
+
+    def pending_pages(self, pages, paths, job, resume=True):
+        """
+        Yields the pages of a document that still need to be analyzed, recording each in the job ledger.
+
+        Pages the ledger has as written are skipped, so an interrupted run does not send them to
+        Azure again; written pages that were not archived yet are archived now.
+
+        Args:
+            pages (iterable): The document's pages.
+            paths (dict): A dictionary containing the paths for input, processed, output, and archive directories.
+            job (sqlite3.Row): The document's entry in the job ledger, or None to yield every page.
+            resume (bool): Whether to skip written pages.
+        """
+        states = self.ledger.page_states(job['id']) if job is not None else {}
+        for page in pages:
+            state = states.get(page.page_number)
+            if resume and state in (WRITTEN, ARCHIVED):
+                if state == WRITTEN:
+                    if page.path is not None or page.data is not None:  # Page ranges have nothing to archive
+                        self.archive_page(page, paths)
+                    self.mark_page(job, page, ARCHIVED)
+                elif page.path is not None:
+                    os.remove(page.path)  # Split again from a re-dropped file; the original is already archived
+                print(f"Skipping {page.name}: already written")
+                current_report().count('skipped_pages')
+                progress.emit(progress.WRITTEN, page.name)
+                continue
+            if state is None:
+                self.mark_page(job, page, SPLIT)
+            progress.emit(progress.QUEUED, page.name)
+            yield page
+
+    def mark_page(self, job, page, state, error=None, continuation_token=None):
+        """
+        Records the state of a page in the job ledger, if the document has an entry.
+        """
+        if job is not None:
+            with current_report().stage('job ledger'):
+                self.ledger.mark_page(job['id'], page, state, error, continuation_token)
+
+    def continuation_tokens(self, job):
+        """
+        Returns {page name: continuation token} for the pages of a document a cancelled batch left in flight.
+        """
+        return self.ledger.continuation_tokens(job['id']) if job is not None else {}
+
+    def return_page(self, job, page, cancelled):
+        """
+        Puts a page whose analysis was cancelled back in the queue: it stays split in the job
+        ledger, with the continuation token of its abandoned poller so the next run picks up
+        the service's result instead of uploading the page again.
+        """
+        self.mark_page(job, page, SPLIT, str(cancelled), cancelled.continuation_token)
+        current_report().count('cancelled_pages')
+        progress.emit(progress.CANCELLED, page.name)
+
+    def processed_pages(self, paths):
+        """
+        Returns the split pages waiting in the processed directory, in page order.
+
+        Only used by recover_processed; a normal run analyzes the pages split from each file.
+        """
+        files = sorted((f for f in os.listdir(paths['processed']) if f.endswith(".pdf")), key=page_sort_key)
+        return [Page(os.path.splitext(file)[0], page_sort_key(file)[1], None, os.path.join(paths['processed'], file)) for file in files]
+
+    def recover_processed(self, paths, multi_page, doc_type):
+        """
+        Analyzes split pages left in the processed directory by an interrupted run or a failed page.
+
+        Args:
+            paths (dict): A dictionary containing the paths for input, processed, output, and archive directories.
+            multi_page (bool): Whether to also save the aggregated invoice line items.
+            doc_type (str): 'Invoice' or 'Purchase Order'.
+
+        Returns:
+            int: The number of pages found.
+        """
+        pages = self.processed_pages(paths)
+        if not pages:
+            return 0
+        print(f"Recovering {len(pages)} page(s) from {paths['processed']}")
+        if doc_type == 'Invoice':
+            self.process_invoices(paths, multi_page, pages)
+        else:
+            self.analyze_general_documents(paths, pages)
+        return len(pages)
+
+    def archive_page(self, page, paths):
+        """
+        Moves a split page to archive_processed, or saves an in-memory page there if archiving is enabled.
+        """
+        with current_report().stage('archive'):
+            if page.path is not None:
+                shutil.move(page.path, os.path.join(paths['archive_processed'], os.path.basename(page.path)))
+            elif get_setting('analysis', 'archive_split_pages', False):
+                with open(os.path.join(paths['archive_processed'], f"{page.name}.pdf"), 'wb') as out:
+                    out.write(page.data)
+
+    def analyze_document_ranges(self, file_path, paths, multi_page, doc_type, output=None, job=None):
+        """
+        Analyze a whole PDF without splitting it, sending page ranges of the original file.
+
+        Outputs use the same names as when the PDF is split first ("name_3_table_0.xlsx",
+        "name_3.xlsx"), with the page number taken from each table's or invoice's bounding regions.
+
+        Args:
+            file_path (str): The path to the PDF in the input directory.
+            paths (dict): A dictionary containing the paths for input, processed, output, and archive directories.
+            multi_page (bool): Whether to also save the aggregated invoice line items.
+            doc_type (str): 'Invoice' or 'Purchase Order'.
+            output (StreamingWorkbook, optional): Batch workbook for the per-invoice outputs.
+            job (sqlite3.Row, optional): The document's entry in the job ledger; each range is recorded
+                as a page numbered by its first page.
+        """
+        with open(file_path, "rb") as fd:
+            document = fd.read()
+        page_count = len(PdfReader(io.BytesIO(document)).pages)
+        ranges = page_ranges(page_count, get_setting('analysis', 'pages_per_request', 10))
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        model_id = "prebuilt-invoice" if doc_type == 'Invoice' else "prebuilt-document"
+
+        aggregate = self.open_aggregated_output('invoices', paths) if doc_type == 'Invoice' and multi_page else None
+        line_items = LineItemAccumulator(aggregate)
+        range_pages = {pages: Page(f"{name}_{pages}", int(pages.split('-')[0]), None, None) for pages in ranges}
+        pending = {page.page_number for page in self.pending_pages(range_pages.values(), paths, job, resume=aggregate is None)}
+        ranges = [pages for pages, page in range_pages.items() if page.page_number in pending]
+        errors = []
+        report = current_report()
+        returned = 0
+        for index, pages, result, error in self.analysis_pool.analyze_ranges(model_id, document, ranges, name, self.continuation_tokens(job)):
+            if isinstance(error, Cancelled):
+                self.return_page(job, range_pages[pages], error)
+                returned += 1
+                line_items.skip(index)
+                continue
+            start, _, end = pages.partition('-')
+            report.count('pages', int(end or start) - int(start) + 1)
+            if error is not None:
+                errors.append(f"Error processing pages {pages} of {file_path}: {error}")
+                report.count('errors')
+                self.mark_page(job, range_pages[pages], SPLIT, str(error))
+                progress.emit(progress.FAILED, range_pages[pages].name, str(error))
+                line_items.skip(index)
+                continue
+            self.mark_page(job, range_pages[pages], ANALYZED)
+
+            outputs = []
+            if doc_type == 'Invoice':
+                invoices = [invoice for invoice in result.documents if invoice.fields]
+                all_data_dfs, line_items_dfs = self.invoice_dfs([invoice.fields for invoice in invoices])
+                for invoice, all_data_df, line_items_df in zip(invoices, all_data_dfs, line_items_dfs):
+                    outputs += self.save_document_output(all_data_df, line_items_df, f"{name}_{first_page(invoice)}", 'Invoice', paths, output)
+                with report.stage('output'):
+                    line_items.add(index, line_items_dfs if multi_page else [])
+            else:
+                report.count('tables', len(result.tables))
+                for page, tables in tables_by_page(result).items():
+                    for i, table in enumerate(tables):
+                        outputs += self.save_table_output(table, f"{name}_{page}_table_{i}", paths)
+            self.mark_page(job, range_pages[pages], WRITTEN)
+            progress.emit(progress.WRITTEN, range_pages[pages].name, outputs=outputs)
+
+        if errors:
+            self.log_errors(errors)
+
+        if aggregate is not None and returned:
+            aggregate.discard()  # Written in full by the run that finishes the document
+        elif aggregate is not None:
+            # Multi-page invoices come back as a single document, so the aggregate is just the ranges in order
+            aggregate_path = os.path.join(paths['output'], f"{name}_aggregated.xlsx")
+            with report.stage('output'):
+                line_items.close()
+                aggregate.close(aggregate_path)
+            progress.record_output(aggregate_path)
+
+        if returned:
+            raise Cancelled(f"{returned} page range(s) returned to the queue")
+
+    def save_table_output(self, table, file_name, paths):
+        """
+        Writes an analyzed table in each output format and returns the paths written.
+        """
+        report = current_report()
+        with report.stage('table extraction'):
+            df = table_frame(table)  # The first row of the table becomes the column headers
+        source_headers = list(df.columns)
+        with report.stage('header mapping'):
+            df = self.replace_import_headers(df)  # Optionally replace headers based on your logic
+        if get_setting('batch_clean', 'native', False):
+            with report.stage('clean'):
+                # Replaces the batchClean macro, before anything is written
+                df = clean_table(df, source_headers=source_headers)
+        report.count('rows', len(df))
+        with report.stage('output'):
+            return write_table(df, paths['output'], file_name, self.formats)  # In each format from output.table_formats
+
+    def move_to_archive(self, path, archive_path):
+        for file in os.listdir(base_path + path):
+            if os.path.isfile(base_path + path + file):
+                shutil.move(base_path + path + file, base_path + archive_path + file)
+
+    def replace_import_headers(self, df):
+        try:
+            
+            # Map headers using data_transformation.header_mappings from config.yaml
+            new_headers = header_mapper.map_headers(df.columns)
+            if new_headers is None:
+                df.columns = df.columns.astype(str).str.lower()
+                return df  # Skip replacements if no target words are found
+            df.columns = new_headers
+
+            # Part number identification and renaming
+            part_number_column_index = find_part_number_column(df)
+
+            if part_number_column_index is not None:
+                columns = list(df.columns)
+                columns[part_number_column_index] = 'pr_codenum'
+                df.columns = columns
+
+        except Exception as e:
+            print(f"Error occurred while replacing import headers: {e}")
+            # Optionally, log the error or handle it as per requirement
+            return df  # Return the dataframe even if an error occurs to not interrupt the flow
+
+        return df
+
+    def pullPricesFromExcel(self, folder_path="P:/Temp"):
+        """
+        Method to pull prices from extracted tables in a folder and process them.
+
+        Tables written as Parquet or CSV (see output.table_formats) are read instead of
+        their xlsx copies; the priced result is always saved as xlsx.
+
+        Args:
+        folder_path (str): Path to the folder containing the extracted tables.
+        """
+        report = current_report()
+
+        # Load the LPC price index once for all files; it is only rebuilt when the workbook changes
+        with report.stage('load LPC'):
+            lpc_index = get_price_index()
+
+        # Get one file per table in the folder, skipping earlier pricing results
+        for file_path in list_tables(folder_path, exclude_prefix="processed_"):
+            file = os.path.basename(file_path)
+            try:
+                # Read the current table
+                with report.stage('read tables'):
+                    original_df = read_table(file_path)
+
+                # Map PO Cost from LPC to original dataframe based on part numbers
+                with report.stage('pricing'):
+                    original_df = lpc_index.price(original_df)
+
+                # Save the processed data to a new file with the original filename
+                with report.stage('output'):
+                    original_df.to_excel(os.path.join(folder_path, f"processed_{os.path.splitext(file)[0]}.xlsx"), index=False)
+            except Exception as e:
+                print(f"Error processing {file}: {e}")
+                continue
+
+    def save_document_output(self, all_data_df, line_items_df, file_name, doc_type, paths, output=None):
+        """
+        Writes an invoice's details and line items and returns the paths written; sheets added to
+        the batch workbook are not included, as it is only saved at the end of the run.
+        """
+        report = current_report()
+        report.count('invoices')
+        report.count('rows', len(line_items_df))
+        with report.stage('output'):
+            return self._save_document_output(all_data_df, line_items_df, file_name, doc_type, paths, output)
+
+    def _save_document_output(self, all_data_df, line_items_df, file_name, doc_type, paths, output=None):
+        formats = self.formats
+        other_formats = [fmt for fmt in formats if fmt != 'xlsx']
+        written = []
+        if other_formats:
+            written += write_table(all_data_df, paths['output'], f'{file_name}_details', other_formats)
+            written += write_table(line_items_df, paths['output'], f'{file_name}_items', other_formats)
+        if 'xlsx' not in formats:
+            return written
+
+        if output is not None:
+            # Batch workbook: one pair of sheets per document
+            output.write_frame(file_name, all_data_df, index=False, suffix=' Details')
+            output.write_frame(file_name, line_items_df, index=True, suffix=' Items')
+            return written
+
+        output_file_path = os.path.join(paths['output'], f'{file_name}.xlsx')
+        with StreamingWorkbook(output_file_path) as workbook:
+            workbook.write_frame(f'{doc_type} Details', all_data_df, index=False)
+            workbook.write_frame('Line Items', line_items_df, index=True)  # Keeping index=True since you want the index to start from 1
+        return [output_file_path] + written
+
+    def open_document_output(self, paths, doc_type):
+        """
+        Opens the batch workbook for a run if output.batch_workbook is set, otherwise returns None.
+        """
+        if not get_setting('output', 'batch_workbook', False):
+            return None
+        run_date = datetime.now().strftime("%m-%d_%H_%M")
+        return StreamingWorkbook(os.path.join(paths['output'], f'{doc_type} {run_date}.xlsx'))
+
+    def open_aggregated_output(self, data_type, paths):
+        """
+        Opens a workbook that aggregated rows are streamed into; it is named when it is closed.
+        """
+        return AggregatedOutput(os.path.join(paths['output'], f'{data_type}_aggregated.xlsx'),
+                                f'Aggregated {data_type.capitalize()}', ITEM_COLUMNS)
+
+    def save_aggregated_output(self, dataframe, data_type, paths, file_name):
+        output_file_path = os.path.join(paths['output'], f'{file_name}_aggregated.xlsx')
+        with StreamingWorkbook(output_file_path) as workbook:
+            workbook.write_frame(f'Aggregated {data_type.capitalize()}', dataframe, index=True)
@@ -0,0 +1,241 @@
+#price_index.py
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from settings import get_setting, script_dir
+
+LPC_PATH = get_setting('pricing', 'lpc_path')
+LPC_SHEET = get_setting('pricing', 'lpc_sheet', 'All')
+SIDECAR_DIR = os.path.join(script_dir, get_setting('pricing', 'sidecar_directory', 'cache/lpc/'))
+
+# LPC frames already loaded in this process, keyed by (path, sheet) -> (signature, DataFrame)
+_lpc_frames = {}
+_lpc_lock = threading.Lock()
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sidecar_base(path, sheet_name):
+    # The source may live on a read-only share, so sidecars are kept locally
+    key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:12]
+    return os.path.join(SIDECAR_DIR, f"{os.path.splitext(os.path.basename(path))[0]}.{sheet_name}.{key}")
+
+
+def _read_sidecar(base, path, signature):
+    try:
+        with open(f"{base}.json", 'r') as fd:
+            meta = json.load(fd)
+    except (OSError, ValueError):
+        return None
+
+    if meta['signature'] != signature:
+        # A copied or touched workbook gets a new mtime; only rebuild if the content changed
+        if meta['signature']['size'] != signature['size'] or meta['sha256'] != file_hash(path):
+            return None
+        meta['signature'] = signature
+        with open(f"{base}.json", 'w') as fd:
+            json.dump(meta, fd)
+
+    try:
+        if meta['format'] == 'parquet':
+            return pd.read_parquet(f"{base}.parquet")
+        return pd.read_pickle(f"{base}.pkl")
+    except Exception as e:
+        print(f"Error reading LPC sidecar {base}: {e}")
+        return None
+
+
+def _write_sidecar(base, path, signature, lpc_df):
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    try:
+        lpc_df.to_parquet(f"{base}.parquet", index=False)
+        sidecar_format = 'parquet'
+    except Exception:
+        # pyarrow is optional, and mixed-type columns from Excel cannot always be stored as Parquet
+        lpc_df.to_pickle(f"{base}.pkl")
+        sidecar_format = 'pickle'
+    with open(f"{base}.json", 'w') as fd:
+        json.dump({'signature': signature, 'sha256': file_hash(path), 'format': sidecar_format}, fd)
+
+
+def load_lpc(path=None, sheet_name=None):
+    """
+    Loads the Last Part Cost workbook, parsing the xlsx only when it has changed.
+
+    The parsed sheet is saved as a columnar sidecar under pricing.sidecar_directory and
+    reused until the workbook's modification time and content change. Within a process
+    the DataFrame is also kept in memory, so repeated calls only stat the workbook.
+
+    Args:
+        path (str, optional): The LPC workbook; defaults to pricing.lpc_path in config.yaml.
+        sheet_name (str, optional): The sheet to load; defaults to pricing.lpc_sheet.
+
+    Returns:
+        DataFrame: The LPC sheet. Callers must not modify it, since it is shared.
+    """
+    path = path or LPC_PATH
+    sheet_name = sheet_name or LPC_SHEET
+    signature = file_signature(path)
+
+    with _lpc_lock:
+        cached = _lpc_frames.get((path, sheet_name))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        base = _sidecar_base(path, sheet_name)
+        lpc_df = _read_sidecar(base, path, signature)
+        if lpc_df is None:
+            lpc_df = pd.read_excel(path, sheet_name=sheet_name)
+            try:
+                _write_sidecar(base, path, signature, lpc_df)
+            except OSError as e:
+                print(f"Error writing LPC sidecar {base}: {e}")
+
+        _lpc_frames[(path, sheet_name)] = (signature, lpc_df)
+        return lpc_df
+
+
+def normalize_part_numbers(part_numbers):
+    return pd.Series(part_numbers, dtype=object).astype(str).str.strip().str.upper()
+
+
+class PriceIndex:
+    def __init__(self, lpc_df, key='pr_codenum', columns=None):
+        """
+        Hash index over the LPC sheet for looking up prices by part number.
+
+        Args:
+            lpc_df (DataFrame): The LPC sheet, as returned by load_lpc.
+            key (str): The part number column.
+            columns (list, optional): Columns added by price(); defaults to "PO Cost" plus
+                pricing.metadata_columns from config.yaml.
+        """
+        self.key = key
+        self.columns = columns or ['PO Cost'] + list(get_setting('pricing', 'metadata_columns', None) or [])
+
+        # Rows without a part number cannot be looked up; for duplicates the first row wins, as in Excel's VLOOKUP
+        frame = lpc_df[lpc_df[key].notna()]
+        frame = frame.set_index(normalize_part_numbers(frame[key]).to_numpy()).drop(columns=[key])
+        self.frame = frame[~frame.index.duplicated(keep='first')]
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __contains__(self, part_number):
+        return normalize_part_numbers([part_number])[0] in self.frame.index
+
+    def get(self, part_number):
+        """
+        Returns the LPC row for a single part number as a dict, or None if it is not in the LPC.
+        """
+        normalized = normalize_part_numbers([part_number])[0]
+        if normalized not in self.frame.index:
+            return None
+        return self.frame.loc[normalized].to_dict()
+
+    def lookup(self, part_numbers, columns=None):
+        """
+        Looks up a column of part numbers in one vectorized pass.
+
+        Args:
+            part_numbers (iterable): The part numbers to look up.
+            columns (list, optional): LPC columns to return; defaults to self.columns.
+
+        Returns:
+            DataFrame: One row per part number, in the same order, with NaN for unknown parts.
+        """
+        columns = columns or self.columns
+        found = self.frame[[column for column in columns if column in self.frame.columns]]
+        return found.reindex(normalize_part_numbers(part_numbers).to_numpy()).reset_index(drop=True)
+
+    def price(self, df, column='pr_codenum'):
+        """
+        Returns a copy of df with the LPC price columns added next to the existing columns.
+
+        Unlike merging against the LPC this never duplicates rows, and df keeps its index.
+        """
+        prices = self.lookup(df[column])
+        prices.index = df.index
+        return df.assign(**{name: prices[name] for name in prices.columns})
+
+
+_shared_index = None
+_shared_index_source = None
+
+
+def get_price_index(path=None, sheet_name=None):
+    """
+    Returns a PriceIndex over the LPC workbook, shared by every caller in the process.
+
+    The index is rebuilt only when load_lpc returns a new frame, i.e. when the workbook changed.
+    """
+    global _shared_index, _shared_index_source
+    lpc_df = load_lpc(path, sheet_name)
+    with _lpc_lock:
+        if _shared_index is None or _shared_index_source is not lpc_df:
+            _shared_index = PriceIndex(lpc_df)
+            _shared_index_source = lpc_df
+        return _shared_index
+
+
+def to_number(values):
+    """
+    Converts a column of prices or quantities to floats, accepting text such as "$1,234.50".
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    cleaned = values.astype(str).str.replace(r'[$,\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def price_check(df, price_column='pu_price', amount_column='amount', quantity_column='pu_quant', cost_column='PO Cost'):
+    """
+    Compares invoiced or PO prices against the LPC cost, using whole-column arithmetic.
+
+    Adds three columns:
+        Adjusted Qty: The quantity when the price matches the LPC cost, otherwise the
+            line amount divided by the LPC cost, i.e. the quantity at the expected price.
+        Price Variance: Price minus LPC cost.
+        Variance %: Price variance as a percentage of the LPC cost.
+
+    Rows without an LPC cost (or with a zero cost) get NaN in all three columns.
+
+    Args:
+        df (DataFrame): A priced table, see PriceIndex.price.
+
+    Returns:
+        DataFrame: A copy of df with the three columns added.
+    """
+    cost = to_number(df[cost_column]).to_numpy()
+    cost = np.where(cost == 0, np.nan, cost)
+    price = to_number(df[price_column]).to_numpy() if price_column in df.columns else np.full(len(df), np.nan)
+    amount = to_number(df[amount_column]).to_numpy() if amount_column in df.columns else np.full(len(df), np.nan)
+
+    quantity_at_cost = amount / cost
+    if quantity_column in df.columns:
+        quantity = to_number(df[quantity_column]).to_numpy()
+        adjusted_qty = np.where(price == cost, quantity, quantity_at_cost)
+    else:
+        adjusted_qty = quantity_at_cost
+    adjusted_qty = np.where(np.isnan(cost), np.nan, adjusted_qty)
+
+    variance = price - cost
+    return df.assign(**{
+        'Adjusted Qty': np.round(adjusted_qty, 2),
+        'Price Variance': np.round(variance, 2),
+        'Variance %': np.round(variance / cost * 100, 2),
+    })
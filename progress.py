@@ -0,0 +1,162 @@
+#progress.py
+import contextvars
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Per-page progress events for a live view of a batch. Like run_report.py, the listener and the
+# document being processed are context variables, so the analysis pool's worker threads report
+# to the caller's listener with the right document name.
+
+# Page states, in order
+QUEUED = 'queued'
+UPLOADING = 'uploading'
+ANALYZING = 'analyzing'
+WRITTEN = 'written'
+FAILED = 'failed'
+CANCELLED = 'cancelled'  # Returned to the queue; the next run picks the page or document up again
+
+# Final document states (a document is also QUEUED until its turn, and FAILED if it raised)
+DONE = 'done'
+SKIPPED = 'skipped'
+
+FINAL_STATES = (WRITTEN, FAILED, CANCELLED, DONE, SKIPPED)
+
+# page is None for events about the whole document. seconds is the time since the page was
+# queued, or since the document started. outputs are the files written so far that can be opened.
+ProgressEvent = namedtuple('ProgressEvent', ['document', 'page', 'state', 'seconds', 'error', 'outputs'])
+
+_listener = contextvars.ContextVar('progress_listener', default=None)
+_document = contextvars.ContextVar('progress_document', default=None)
+
+
+class _DocumentProgress:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.queued = {}
+        self.outputs = []
+        self.lock = threading.Lock()
+
+    def seconds(self, page, state):
+        now = time.perf_counter()
+        with self.lock:
+            if page is None:
+                return now - self.started
+            if state == QUEUED:
+                self.queued[page] = now
+            return now - self.queued.get(page, self.started)
+
+    def add_outputs(self, outputs):
+        with self.lock:
+            self.outputs.extend(outputs)
+            return list(self.outputs)
+
+
+@contextmanager
+def listen(callback):
+    """
+    Sends the progress events of the block, including those of analysis workers, to callback(event).
+    """
+    token = _listener.set(callback)
+    try:
+        yield callback
+    finally:
+        _listener.reset(token)
+
+
+@contextmanager
+def document(name):
+    """
+    Attributes the page events of the block to the document name.
+    """
+    token = _document.set(_DocumentProgress(name))
+    try:
+        yield
+    finally:
+        _document.reset(token)
+
+
+def record_output(path):
+    """
+    Adds a file written for the current document outside of a page, e.g. the aggregated line items.
+    """
+    current = _document.get()
+    if current is not None:
+        current.add_outputs([path])
+
+
+def emit(state, page=None, error=None, outputs=(), document=None):
+    """
+    Reports the state of a page of the current document, or of a whole document when page is None.
+
+    Args:
+        state (str): One of the states above.
+        page (str, optional): The page name, e.g. "name_3" or "name_1-10" for a page range.
+        error (str, optional): Why the page or document failed.
+        outputs (list, optional): Files written for the page.
+        document (str, optional): The document, for events outside of document(), e.g. queuing a batch.
+    """
+    callback = _listener.get()
+    if callback is None:
+        return
+    current = _document.get()
+    if document is not None or current is None:
+        name, seconds = document, None
+    else:
+        name, seconds = current.name, current.seconds(page, state)
+        collected = current.add_outputs(outputs)
+        if page is None:
+            outputs = collected  # Document events carry every output so far, page events only their own
+    callback(ProgressEvent(name, page, state, seconds, error, tuple(outputs)))
+
+
+class ThrottledListener:
+    def __init__(self, callback, interval=0.25):
+        """
+        Passes progress events on in batches, at most one batch per interval.
+
+        Events for the same page within an interval are collapsed to the latest one, so a batch
+        of thousands of pages costs the GUI a few updates per second instead of one per event.
+        Batches are delivered from whichever thread emitted the events or from a timer thread.
+
+        Args:
+            callback (callable): Called with a list of ProgressEvents.
+            interval (float): Seconds between batches.
+        """
+        self.callback = callback
+        self.interval = interval
+        self.pending = {}
+        self.last = 0.0
+        self.timer = None
+        self.lock = threading.Lock()
+        self.delivering = threading.Lock()  # Keeps batches in order when the timer and an emitter flush together
+
+    def __call__(self, event):
+        with self.lock:
+            self.pending[(event.document, event.page)] = event
+            wait = self.last + self.interval - time.monotonic()
+            if wait > 0:
+                if self.timer is None:
+                    # Deliver the batch even if no further events arrive, e.g. while pages are polled
+                    self.timer = threading.Timer(wait, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """
+        Delivers the pending events now.
+        """
+        with self.delivering:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                events = list(self.pending.values())
+                self.pending.clear()
+                self.last = time.monotonic()
+            if events:
+                self.callback(events)
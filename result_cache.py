@@ -0,0 +1,220 @@
+#result_cache.py
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, time as time_of_day
+from azure.ai.formrecognizer import AnalyzeResult
+from settings import get_setting, script_dir
+
+# Entries are <directory>/<first two hex digits>/<SHA-256>.json; other files under the
+# directory (e.g. a sidecar cache configured below it) are never listed or pruned
+_entry_dir = re.compile(r'^[0-9a-f]{2}$')
+_entry_file = re.compile(r'^[0-9a-f]{64}\.json$')
+
+
+def _json_default(value):
+    # AnalyzeResult.to_dict() leaves date and time field values (InvoiceDate, DueDate, ...) as objects
+    if isinstance(value, (date, time_of_day)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _restore_field_values(value):
+    """
+    Turns the ISO strings written by _json_default back into dates and times, as from_dict expects them.
+    """
+    if isinstance(value, dict):
+        if value.get('value_type') in ('date', 'time') and isinstance(value.get('value'), str):
+            parse = date.fromisoformat if value['value_type'] == 'date' else time_of_day.fromisoformat
+            value['value'] = parse(value['value'])
+        for item in value.values():
+            _restore_field_values(item)
+    elif isinstance(value, list):
+        for item in value:
+            _restore_field_values(item)
+    return value
+
+
+class ResultCache:
+    def __init__(self, directory, max_bytes):
+        """
+        On-disk cache of Form Recognizer results keyed by the content of the page.
+
+        Entries are JSON files named after the SHA-256 of the document bytes, the model id,
+        the API version and any analysis options. The modification time of an entry is
+        refreshed on every hit, so pruning removes the least recently used entries first.
+
+        Args:
+            directory (str): Folder holding the cache entries.
+            max_bytes (int): Size the cache is pruned back to after each write.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self.entries())
+
+    def key(self, model_id, api_version, document, **options):
+        digest = hashlib.sha256(document)
+        digest.update(json.dumps([model_id, api_version, sorted(options.items())], default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, model_id, api_version, document, **options):
+        """
+        Returns the cached AnalyzeResult for a document, or None on a miss or an unreadable entry.
+        """
+        path = self._path(self.key(model_id, api_version, document, **options))
+        try:
+            with open(path, 'r') as fd:
+                entry = json.load(fd)
+        except OSError:
+            return None
+        except ValueError as e:
+            print(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+        try:
+            result = AnalyzeResult.from_dict(_restore_field_values(entry['result']))
+            os.utime(path)  # Mark as recently used
+        except Exception as e:
+            print(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+        return result
+
+    def put(self, model_id, api_version, document, result, **options):
+        """
+        Stores an AnalyzeResult and prunes the cache if it grew past max_bytes.
+
+        Caching is best effort: a result that cannot be stored is reported and skipped, as the
+        analysis itself succeeded.
+        """
+        path = self._path(self.key(model_id, api_version, document, **options))
+        # Write to a temporary file first so a crash never leaves a half-written entry
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            entry = {
+                'model_id': model_id,
+                'api_version': api_version,
+                'options': {name: str(value) for name, value in options.items()},
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'result': result.to_dict(),
+            }
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'w') as fd:
+                json.dump(entry, fd, default=_json_default)
+            with self.lock:
+                previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+                os.replace(temp_path, path)
+                self.total_bytes += os.path.getsize(path) - previous_size
+                if self.total_bytes > self.max_bytes:
+                    self._prune(self.max_bytes)
+        except Exception as e:
+            print(f"Could not cache the result for {model_id}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def entries(self):
+        """
+        Returns a list of (path, size, last_used) tuples, least recently used first.
+        """
+        entries = []
+        for prefix in os.listdir(self.directory):
+            folder = os.path.join(self.directory, prefix)
+            if not _entry_dir.match(prefix) or not os.path.isdir(folder):
+                continue
+            for file in os.listdir(folder):
+                if _entry_file.match(file) and file.startswith(prefix):
+                    try:
+                        stat = os.stat(os.path.join(folder, file))
+                    except OSError:  # Pruned by another process
+                        continue
+                    entries.append((os.path.join(folder, file), stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def prune(self, max_bytes=None):
+        """
+        Removes least recently used entries until the cache is no larger than max_bytes.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self.lock:
+            return self._prune(self.max_bytes if max_bytes is None else max_bytes)
+
+    def _prune(self, max_bytes):
+        entries = self.entries()
+        self.total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if self.total_bytes <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_bytes -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        return self.prune(0)
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Returns the cache configured under result_cache in config.yaml, or None if it is disabled.
+    """
+    global _shared_cache
+    if not get_setting('result_cache', 'enabled', False):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            directory = os.path.join(script_dir, get_setting('result_cache', 'directory', 'cache/results/'))
+            max_bytes = int(get_setting('result_cache', 'max_size_mb', 500) * 1024 * 1024)
+            _shared_cache = ResultCache(directory, max_bytes)
+        return _shared_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or prune the Form Recognizer result cache.")
+    parser.add_argument('command', choices=['info', 'list', 'prune', 'clear'])
+    parser.add_argument('--max-mb', type=float, help="Size to prune to (defaults to max_size_mb from config.yaml)")
+    args = parser.parse_args()
+
+    directory = os.path.join(script_dir, get_setting('result_cache', 'directory', 'cache/results/'))
+    max_bytes = int(get_setting('result_cache', 'max_size_mb', 500) * 1024 * 1024)
+    cache = ResultCache(directory, max_bytes)
+
+    if args.command == 'info':
+        print(f"Directory: {cache.directory}")
+        print(f"Entries:   {len(cache.entries())}")
+        print(f"Size:      {cache.total_bytes / 1024 / 1024:.1f} MB of {max_bytes / 1024 / 1024:.1f} MB")
+    elif args.command == 'list':
+        for path, size, last_used in cache.entries():
+            try:
+                with open(path, 'r') as fd:
+                    entry = json.load(fd)
+            except (OSError, ValueError) as e:
+                print(f"Could not read {path}: {e}")
+                continue
+            print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(last_used))}  {size:>10}  "
+                  f"{entry['model_id']:<18} {entry['api_version']:<12} {os.path.basename(path)[:16]}")
+    elif args.command == 'prune':
+        target = max_bytes if args.max_mb is None else int(args.max_mb * 1024 * 1024)
+        print(f"Removed {cache.prune(target)} entries.")
+    else:
+        print(f"Removed {cache.clear()} entries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#run_report.py
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# The report of the run in progress. Worker threads of the analysis pool run in a copy of the
+# submitting thread's context, so their timings and counters end up in the same report.
+_active_report = contextvars.ContextVar('run_report', default=None)
+
+
+class RunReport:
+    def __init__(self, doc_type=None):
+        """
+        Timers and counters for one run of the pipeline.
+
+        Stage times are summed over threads and can be nested: the time of an inner stage
+        (e.g. header mapping inside output) is not counted again in the outer one. Counters
+        track pages, tables, rows, bytes uploaded, retries and so on.
+
+        Args:
+            doc_type (str, optional): 'Invoice' or 'Purchase Order'.
+        """
+        self.doc_type = doc_type
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.elapsed = None
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the block under the given stage name.
+        """
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            inner = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.seconds[name] += elapsed - inner
+                self.calls[name] += 1
+
+    def iterate(self, name, iterable):
+        """
+        Yields from iterable, timing the production of each item (e.g. splitting the next page).
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    @contextmanager
+    def activate(self):
+        """
+        Makes this the report that current_report() returns in this thread and in analysis workers.
+        """
+        token = _active_report.set(self)
+        try:
+            yield self
+        finally:
+            _active_report.reset(token)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self._start
+
+    def to_dict(self):
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self._start
+        pages = self.counters.get('pages', 0)
+        return {
+            'doc_type': self.doc_type,
+            'started': self.started.isoformat(timespec='seconds'),
+            'elapsed_seconds': round(elapsed, 3),
+            'pages_per_second': round(pages / elapsed, 3) if elapsed else None,
+            'counters': dict(sorted(self.counters.items())),
+            'stages': {
+                name: {'seconds': round(seconds, 3), 'calls': self.calls[name]}
+                for name, seconds in sorted(self.seconds.items(), key=lambda item: item[1], reverse=True)
+            },
+        }
+
+    def write(self, directory):
+        """
+        Writes the report as run_report_<date>.json in directory and returns its path.
+
+        Runs that start together (e.g. documents processed at once by the folder watcher)
+        never overwrite each other's report: the name has microseconds, and a counter is
+        added if the file exists anyway.
+        """
+        stem = f"run_report_{self.started.strftime('%Y-%m-%d_%H-%M-%S_%f')}"
+        counter = 1
+        while True:
+            path = os.path.join(directory, f"{stem}.json" if counter == 1 else f"{stem}_{counter}.json")
+            try:
+                fd = open(path, 'x')
+            except FileExistsError:
+                counter += 1
+                continue
+            with fd:
+                json.dump(self.to_dict(), fd, indent=2)
+            return path
+
+    def summary(self, stages=3):
+        """
+        Returns a one-line summary for the status bar, with the slowest stages.
+        """
+        report = self.to_dict()
+        counters = report['counters']
+        parts = [f"{counters.get('pages', 0)} pages in {report['elapsed_seconds']:.1f}s"]
+        if report['pages_per_second']:
+            parts[0] += f" ({report['pages_per_second']:.2f} pages/s)"
+        slowest = list(report['stages'].items())[:stages]
+        if slowest:
+            parts.append(', '.join(f"{name} {stage['seconds']:.1f}s" for name, stage in slowest))
+        problems = [f"{counters[name]} {name}" for name in ('retries', 'errors', 'failed_documents') if counters.get(name)]
+        if problems:
+            parts.append(', '.join(problems))
+        return '; '.join(parts)
+
+
+class _NullReport:
+    # Used when no run is in progress, so instrumented code needs no checks
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def iterate(self, name, iterable):
+        return iterable
+
+    def count(self, name, amount=1):
+        pass
+
+
+_null_report = _NullReport()
+
+
+def active_report():
+    """
+    Returns the report of the run in progress, or None.
+    """
+    return _active_report.get()
+
+
+def current_report():
+    """
+    Returns the report of the run in progress, or a report that records nothing.
+    """
+    return _active_report.get() or _null_report
@@ -0,0 +1,211 @@
+#scheduler.py
+import contextvars
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from azure.core.pipeline.policies import RetryPolicy
+from settings import azure_settings, get_setting
+from run_report import current_report
+from cancellation import current_token
+
+# Form Recognizer S0 allows 15 analyze requests per second per resource
+DEFAULT_REQUESTS_PER_SECOND = 15
+
+# Throttling and transient server errors; anything else (e.g. an unreadable PDF) fails at once
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+# Set while RequestScheduler.call runs a request, so ScheduledRetryPolicy leaves its retries to the scheduler
+_scheduled = contextvars.ContextVar('scheduled_request', default=False)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        Limits the rate of requests shared by every thread talking to an endpoint.
+
+        Args:
+            rate (float): Requests allowed per second.
+            capacity (float, optional): Largest burst allowed; defaults to one second's worth.
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, cancel=None):
+        """
+        Blocks until a request may be sent.
+
+        Args:
+            cancel (CancellationToken, optional): Stops waiting by raising Cancelled.
+        """
+        sleep = cancel.sleep if cancel is not None else time.sleep
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            sleep(delay)
+
+    def pause(self, seconds):
+        """
+        Stops every caller for the given time, e.g. after the service answered 429.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+def retry_after(error):
+    """
+    Returns the delay the service asked for in a throttled response, in seconds, or None.
+    """
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    for name in ('retry-after-ms', 'x-ms-retry-after-ms'):
+        if headers.get(name):
+            try:
+                return float(headers[name]) / 1000
+            except ValueError:
+                pass
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class ScheduledRetryPolicy(RetryPolicy):
+    """
+    The SDK's retry policy, except for analyze submissions sent by a RequestScheduler.
+
+    A throttled or failed submission is returned to the scheduler at once instead of being
+    retried here, because the SDK sleeps through Retry-After without pausing the other threads
+    and cannot be cancelled. Polls (GETs) keep the SDK's retries, as retrying a throttled poll
+    through the scheduler would upload the page again.
+    """
+
+    def is_retry(self, settings, response):
+        if response.http_request.method == 'POST' and _scheduled.get():
+            return False
+        return super().is_retry(settings, response)
+
+
+def is_retryable(error):
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return True  # Connection failures and timeouts
+    return isinstance(error, HttpResponseError) and error.status_code in RETRYABLE_STATUS_CODES
+
+
+class RequestScheduler:
+    def __init__(self, bucket, max_retries=5, backoff_base=1.0, backoff_max=60.0):
+        """
+        Sends requests to an endpoint through a token bucket and retries throttled ones.
+
+        A 429 pauses the whole bucket for the Retry-After time, so every thread backs off
+        together instead of each one hitting the limit in turn. Other retries use full-jitter
+        exponential backoff. Each request gets at most max_retries retries, so a page that keeps
+        failing is reported as an error instead of holding up the batch.
+
+        Args:
+            bucket (TokenBucket): The rate limit of the endpoint.
+            max_retries (int): Retries allowed per request.
+            backoff_base (float): Upper bound of the first backoff, in seconds.
+            backoff_max (float): Largest backoff, in seconds.
+        """
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff(self, attempt, requested=None):
+        """
+        Returns the delay before retry number attempt (0 for the first retry).
+        """
+        if requested is not None:
+            # Spread out the threads that were told to come back at the same time
+            return requested + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, request, label=None):
+        """
+        Runs request() once a token is available, retrying throttled and transient failures.
+
+        Args:
+            request (callable): Sends the request and returns its result.
+            label (str, optional): Name used in retry messages, e.g. the page name.
+
+        Returns:
+            The result of request().
+
+        Raises:
+            The last error once the retry budget is spent, or any error that is not retryable.
+            Cancelled if the batch is cancelled while waiting.
+        """
+        report = current_report()
+        cancel = current_token()
+        attempt = 0
+        while True:
+            with report.stage('rate limit wait'):
+                self.bucket.acquire(cancel)
+            scheduled = _scheduled.set(True)
+            try:
+                return request()
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                requested = retry_after(e)
+                delay = self.backoff(attempt, requested)
+                if getattr(e, 'status_code', None) == 429:
+                    self.bucket.pause(delay)
+                    report.count('throttled')
+                attempt += 1
+                report.count('retries')
+                print(f"Retrying {label or 'request'} in {delay:.1f}s ({attempt}/{self.max_retries}): {e}")
+                with report.stage('retry backoff'):
+                    cancel.sleep(delay)
+            finally:
+                _scheduled.reset(scheduled)
+
+
+# One scheduler per endpoint, shared like the concurrency limit in analysis.py
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(service, endpoint):
+    """
+    Returns the scheduler for an endpoint, configured from azure_settings and the scheduler section of config.yaml.
+
+    Args:
+        service (str): The service type under azure_settings, e.g. "pos".
+        endpoint (str): The endpoint the service's client talks to.
+    """
+    with _schedulers_lock:
+        if endpoint not in _schedulers:
+            rate = azure_settings.get(service, {}).get('requests_per_second', DEFAULT_REQUESTS_PER_SECOND)
+            _schedulers[endpoint] = RequestScheduler(
+                TokenBucket(rate),
+                max_retries=get_setting('scheduler', 'max_retries', 5),
+                backoff_base=get_setting('scheduler', 'backoff_base_seconds', 1.0),
+                backoff_max=get_setting('scheduler', 'backoff_max_seconds', 60.0),
+            )
+        return _schedulers[endpoint]
@@ -0,0 +1,31 @@
+#settings.py
+import os
+import yaml
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+config_path = os.path.join(script_dir, "config.yaml")
+
+# Load the YAML configuration file
+config = {}
+with open(config_path, 'r') as stream:
+    try:
+        config = yaml.safe_load(stream) or {}
+    except yaml.YAMLError as exc:
+        print(exc)
+
+azure_settings = config.get("azure_settings", {})
+
+
+def get_setting(section, name, default=None):
+    """
+    Returns a value from a top-level section of config.yaml.
+
+    Args:
+        section (str): The top-level section, e.g. "analysis".
+        name (str): The key inside the section.
+        default: Value returned when the section or key is missing.
+
+    Returns:
+        The configured value, or default.
+    """
+    return (config.get(section) or {}).get(name, default)
@@ -4,9 +4,12 @@
 import yaml
 import os
 import pandas as pd
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
-from PyPDF2 import PdfFileWriter, PdfFileReader
+import sys
+
+# Shared modules live in the application folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import pdf_pages
+import clients
 
 
 # Load the YAML configuration file
@@ -32,18 +35,8 @@ def on_user_selection(selection):
 # Initialize Azure client
 
 def get_azure_client(service_type):
-    if service_type not in azure_settings:
-        raise ValueError(f"Invalid service_type: {service_type}")
-    
-    key_name = f"AZURE_API_KEY_{service_type.upper()}"  
-    key = os.getenv(key_name)
-    if not key:
-        raise EnvironmentError(f"Azure API key for {service_type} not set.")
-
-    endpoint = azure_settings[service_type]["endpoint"]
-    client = DocumentAnalysisClient(endpoint=endpoint, credential=AzureKeyCredential(key))
-    
-    return client
+    # Built once per service type and shared, so connections are reused between calls
+    return clients.get_client(service_type)
 
 
 # Function to split multi-page PDFs into single-page PDFs
@@ -55,14 +48,10 @@ def split_pdfs(input_folder, output_folder):
     """
     for filename in os.listdir(input_folder):
         if filename.endswith(".pdf"):
-            input_pdf = PdfFileReader(open(f"{input_folder}/{filename}", "rb"))
-
-            for i in range(input_pdf.getNumPages()):
-                output = PdfFileWriter()
-                output.addPage(input_pdf.getPage(i))
-
-                with open(f"{output_folder}/{filename[:-4]}_page_{i}.pdf", "wb") as output_pdf:
-                    output.write(output_pdf)
+            for page in pdf_pages.iter_pdf_pages(f"{input_folder}/{filename}", name=f"{filename[:-4]}_page"):
+                # Keep the original zero-based page suffix
+                with open(f"{output_folder}/{filename[:-4]}_page_{page.page_number - 1}.pdf", "wb") as output_pdf:
+                    output_pdf.write(page.data)
 
 # Function to send a PDF to Azure for data extraction
 def send_pdf_to_azure(file_path, client):
@@ -12,8 +12,13 @@ import pandas as pd
 from PyPDF2 import PdfReader, PdfWriter
 from azure.ai.formrecognizer import DocumentAnalysisClient
 from azure.core.credentials import AzureKeyCredential
-import re
 import win32com.client
+
+# Shared modules live in the application folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import price_index
+import header_mapping
+
 # Azure credentials and paths
 
 main_path = "C:/Users/daniel.pace/Documents/Coding/PO Automation/Azure/Purchase Orders/"
@@ -185,11 +190,11 @@ class PDFProcessingApp(QMainWindow):
 
             # Step 2: Split PDF
             # Note: split_pdf now takes a single file path, not a directory
-            self.split_pdf(os.path.join(main_path, paths['input'], filename))
+            split_files = self.split_pdf(os.path.join(main_path, paths['input'], filename))
 
             # Step 3: Analyze documents
-            # analyze_general_documents now processes files directly from the 'processed' directory
-            self.analyze_general_documents()
+            # Only the pages split from this file, not everything left in the 'processed' directory
+            self.analyze_general_documents(split_files)
 
             # Step 4: Move original file to 'archive_input'
             shutil.move(os.path.join(main_path, paths['input'], filename), os.path.join(main_path, paths['archive_input'], filename))
@@ -210,15 +215,16 @@ class PDFProcessingApp(QMainWindow):
             file_path (str): The path to the PDF file to be split.
 
         Returns:
-            None
+            list: The file names of the split pages in the 'processed' directory.
         """
         # Ensure the path points to a file
         if not file_path.endswith(".pdf"):
             print(f"Error: {file_path} is not a PDF file.")
-            return
+            return []
 
         # Initialize PdfReader with the provided file path
         pdf = PdfReader(file_path)
+        split_files = []
         for i, page in enumerate(pdf.pages):
             pdf_writer = PdfWriter()
             pdf_writer.add_page(page)
@@ -230,6 +236,8 @@ class PDFProcessingApp(QMainWindow):
             # Write out each page as a separate PDF
             with open(output_filepath, 'wb') as out:
                 pdf_writer.write(out)
+            split_files.append(output_filename)
+        return split_files
 
     def extract_table_data(self, table):
         table_data = []
@@ -244,8 +252,10 @@ class PDFProcessingApp(QMainWindow):
         table_data.append(row_data)  # Append the last row
         return table_data
 
-    def analyze_general_documents(self):
-        files = [f for f in os.listdir(main_path + paths['processed']) if f.endswith(".pdf")]
+    def analyze_general_documents(self, files=None):
+        if files is None:
+            # Recovery only: pick up everything left in the 'processed' directory
+            files = [f for f in os.listdir(main_path + paths['processed']) if f.endswith(".pdf")]
         
         for i, file in enumerate(files):
             with open(main_path + paths['processed'] + file, "rb") as fd:
@@ -289,15 +299,12 @@ class PDFProcessingApp(QMainWindow):
             df.rename(columns={col: replacements.get(col, col) for col in df.columns}, inplace=True)
 
             # Part number identification and renaming
-            part_number_column = None
-            part_number_pattern = re.compile(r'P\d{2}-\d{3}-\d{3}')
-            for column in df.columns:
-                if df[column].astype(str).str.match(part_number_pattern).any():
-                    part_number_column = column
-                    break
+            part_number_column_index = header_mapping.find_part_number_column(df)
 
-            if part_number_column:
-                df.rename(columns={part_number_column: 'pr_codenum'}, inplace=True)
+            if part_number_column_index is not None:
+                columns = list(df.columns)
+                columns[part_number_column_index] = 'pr_codenum'
+                df.columns = columns
 
         except Exception as e:
             print(f"Error occurred while replacing import headers: {e}")
@@ -348,6 +355,9 @@ class PDFProcessingApp(QMainWindow):
         folder_path (str): Path to the folder containing Excel files.
         """
         folder_path = "P:/Temp"
+        # Load the LPC price index once for all files; it is only rebuilt when the workbook changes
+        lpc_index = price_index.get_price_index()
+
         # Get a list of all Excel files in the folder
         excel_files = [f for f in os.listdir(folder_path) if f.endswith(".xlsx")]
         for file in excel_files:
@@ -358,13 +368,8 @@ class PDFProcessingApp(QMainWindow):
                 # Read the current Excel file
                 original_df = pd.read_excel(file_path, engine='openpyxl')
 
-                # Load the LPC Excel file
-                lpc_df = pd.read_excel(
-                    r"C:\Users\daniel.pace\Documents\Coding\Purchasing Automation\PA_V4\Price Comparison\Last Part Cost 3.1.xlsx",
-                    sheet_name='All')
-                
                 # Map PO Cost from LPC to original dataframe based on part numbers
-                original_df = original_df.merge(lpc_df[['pr_codenum', 'PO Cost']], on='pr_codenum', how='left')
+                original_df = lpc_index.price(original_df)
 
                 # Save the processed data to a new file with the original filename
                 original_df.to_excel(os.path.join(folder_path, f"processed_{file}"), index=False)
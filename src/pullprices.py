@@ -1,6 +1,11 @@
 import os
+import sys
 import pandas as pd
-import re
+
+# Shared modules live in the application folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import price_index
+import header_mapping
 
 folder_path = "P:/Temp"
 
@@ -12,6 +17,9 @@ def pullPricesFromExcel(folder_path):
     folder_path (str): Path to the folder containing Excel files.
     """
 
+    # Load the LPC price index once for all files; it is only rebuilt when the workbook changes
+    lpc_index = price_index.get_price_index()
+
     # Get a list of all Excel files in the folder
     excel_files = [f for f in os.listdir(folder_path) if f.endswith(".xlsx")]
     for file in excel_files:
@@ -22,26 +30,17 @@ def pullPricesFromExcel(folder_path):
         original_df = pd.read_excel(file_path)
 
         # Identify the column with Part Numbers using regex
-        part_number_column = None
-        part_number_pattern = re.compile(r'P\d{2}-\d{3}-\d{3}')
+        part_number_column_index = header_mapping.find_part_number_column(original_df)
 
-        for column in original_df.columns:
-            if original_df[column].astype(str).str.match(part_number_pattern).any():
-                part_number_column = column
-                break
-
-        if part_number_column is None:
+        if part_number_column_index is None:
             raise ValueError("Part number column not found.")
         else:
-            original_df.rename(columns={part_number_column: 'pr_codenum'}, inplace=True)
-        
-        # Load the LPC Excel file
-        lpc_df = pd.read_excel(
-            r"C:\Users\daniel.pace\Documents\Coding\Purchasing Automation\PA_V4\Price Comparison\Last Part Cost 3.1.xlsx",
-            sheet_name='All')
+            columns = list(original_df.columns)
+            columns[part_number_column_index] = 'pr_codenum'
+            original_df.columns = columns
         
         # Map PO Cost from LPC to original dataframe based on part numbers
-        original_df = original_df.merge(lpc_df[['pr_codenum', 'PO Cost']], on='pr_codenum', how='left')
+        original_df = lpc_index.price(original_df)
 
         # Save the processed data to a new file with the original filename
         original_df.to_excel(os.path.join(folder_path, f"processed_{file}"), index=False)
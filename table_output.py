@@ -0,0 +1,105 @@
+#table_output.py
+import os
+import pandas as pd
+from excel_output import StreamingWorkbook
+from settings import get_setting
+
+TABLE_FORMATS = ('xlsx', 'parquet', 'csv')
+
+# When a table exists in several formats, the fastest one to read wins
+READ_PREFERENCE = ('parquet', 'csv', 'xlsx')
+
+
+def table_formats():
+    """
+    Returns the formats tables are written in, from output.table_formats in config.yaml.
+    """
+    formats = get_setting('output', 'table_formats', None) or ['xlsx']
+    unknown = [fmt for fmt in formats if fmt not in TABLE_FORMATS]
+    if unknown:
+        raise ValueError(f"Invalid output.table_formats: {unknown}")
+    return list(formats)
+
+
+def unique_columns(columns):
+    """
+    Renames repeated column names the way read_excel and read_csv do: description, description.1, ...
+    """
+    seen, names = set(columns), []
+    counts = {}
+    for column in columns:
+        name = column
+        if column in counts:
+            while name in seen:
+                counts[column] += 1
+                name = f"{column}.{counts[column]}"
+            seen.add(name)
+        else:
+            counts[column] = 0
+        names.append(name)
+    return names
+
+
+def write_table(df, output_dir, file_name, formats=None):
+    """
+    Writes a table in each configured format.
+
+    Args:
+        df (DataFrame): The table.
+        output_dir (str): The folder to write to.
+        file_name (str): The file name without extension.
+        formats (list, optional): Any of "xlsx", "parquet" and "csv"; defaults to table_formats().
+
+    Returns:
+        list: The paths written.
+    """
+    written = []
+    for fmt in formats or table_formats():
+        path = os.path.join(output_dir, f"{file_name}.{fmt}")
+        if fmt == 'xlsx':
+            with StreamingWorkbook(path) as workbook:
+                workbook.write_frame('Sheet1', df, index=False)
+        elif fmt == 'parquet':
+            # Parquet needs unique column names, and extracted tables are text: make every
+            # column a string so mixed cells can be stored
+            table = df.set_axis(unique_columns([str(column) for column in df.columns]), axis=1)
+            table.astype({column: 'string' for column in table.columns[table.dtypes == object]}).to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        written.append(path)
+    return written
+
+
+def read_table(path):
+    """
+    Reads a table written by write_table, choosing the reader from the file extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        return pd.read_parquet(path)
+    if extension == '.csv':
+        return pd.read_csv(path)
+    return pd.read_excel(path, engine='openpyxl')
+
+
+def list_tables(folder_path, exclude_prefix=None):
+    """
+    Lists the tables in a folder, one path per table in the fastest format available.
+
+    Args:
+        folder_path (str): The folder to search.
+        exclude_prefix (str, optional): Skip files starting with this prefix, e.g. earlier outputs.
+
+    Returns:
+        list: Paths of the tables, sorted by name.
+    """
+    tables = {}
+    for file in os.listdir(folder_path):
+        stem, extension = os.path.splitext(file)
+        fmt = extension.lower().lstrip('.')
+        if fmt not in READ_PREFERENCE or file.startswith('~') or (exclude_prefix and file.startswith(exclude_prefix)):
+            continue
+        current = tables.get(stem)
+        if current is None or READ_PREFERENCE.index(fmt) < READ_PREFERENCE.index(current[0]):
+            tables[stem] = (fmt, os.path.join(folder_path, file))
+    return [tables[stem][1] for stem in sorted(tables)]
@@ -0,0 +1,35 @@
+#tables.py
+import numpy as np
+import pandas as pd
+
+
+def table_grid(table):
+    """
+    Lays out the cells of an analyzed table on a row_count x column_count grid.
+
+    Cells are placed by their row and column index in a single pass, so empty cells stay
+    empty instead of shifting the rest of the row left. A cell spanning several rows or
+    columns is repeated in every position it covers.
+
+    Args:
+        table (DocumentTable): A table from an AnalyzeResult.
+
+    Returns:
+        ndarray: A 2-D object array of cell contents, with "" where there is no cell.
+    """
+    grid = np.full((table.row_count, table.column_count), '', dtype=object)
+    for cell in table.cells:
+        row_end = cell.row_index + (cell.row_span or 1)
+        column_end = cell.column_index + (cell.column_span or 1)
+        grid[cell.row_index:row_end, cell.column_index:column_end] = cell.content
+    return grid
+
+
+def table_frame(table):
+    """
+    Converts an analyzed table to a DataFrame, using its first row as the column headers.
+    """
+    grid = table_grid(table)
+    if len(grid) == 0:
+        return pd.DataFrame()
+    return pd.DataFrame(grid[1:], columns=grid[0], index=range(1, len(grid)))
@@ -0,0 +1,42 @@
+#test_analysis.py
+import random
+from azure.ai.formrecognizer import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+from analysis import AnalysisPool, page_ranges
+from benchmark import synthetic_pdf
+from fake_form_recognizer import FakeFormRecognizer
+from scheduler import RequestScheduler, ScheduledRetryPolicy, TokenBucket
+
+
+def test_page_ranges_cover_every_page_once():
+    assert page_ranges(12, 5) == ['1-5', '6-10', '11-12']
+    assert page_ranges(10, 5) == ['1-5', '6-10']
+
+
+def test_page_ranges_single_pages():
+    assert page_ranges(3, 1) == ['1-1', '2-2', '3-3']
+    assert page_ranges(3, 0) == ['1-1', '2-2', '3-3']  # At least one page per request
+
+
+def test_page_ranges_of_an_empty_document():
+    assert page_ranges(0, 10) == []
+
+
+def test_failed_polls_resume_the_analysis_instead_of_uploading_again(tmp_path):
+    random.seed(1)
+    server = FakeFormRecognizer(('127.0.0.1', 0), latency=0.02, poll_ms=10, poll_error_rate=0.2).start()
+    try:
+        # No SDK retries, so every failed poll reaches the pool
+        client = DocumentAnalysisClient(server.endpoint, AzureKeyCredential('test'),
+                                        retry_policy=ScheduledRetryPolicy(retry_total=0))
+        pool = AnalysisPool(client, server.endpoint, 2, scheduler=RequestScheduler(TokenBucket(100), backoff_base=0.01))
+        synthetic_pdf(str(tmp_path / 'page.pdf'), 1)
+        document = (tmp_path / 'page.pdf').read_bytes()
+
+        results = [pool.analyze('prebuilt-document', document, label=f'page_{index}') for index in range(5)]
+
+        assert all(result.tables for result in results)
+        assert server.counts['poll_errors'] > 0
+        assert server.counts['submitted'] == 5
+    finally:
+        server.shutdown()
@@ -0,0 +1,62 @@
+#test_batch_clean.py
+import pandas as pd
+from batch_clean import clean_table
+from pipeline import Pipeline
+
+
+def vendor_table():
+    # A table continued on a second page, which repeats the vendor's header row
+    return pd.DataFrame([
+        ['2', 'AB-100', 'Widget', '$1,234.50'],
+        ['Qty', 'Deacom #', 'Description', 'Unit Price'],
+        ['5', 'AB-200', 'Gadget', '3.00'],
+    ], columns=['Qty', 'Deacom #', 'Description', 'Unit Price'])
+
+
+def test_repeated_vendor_header_row_is_dropped_after_header_mapping():
+    df = vendor_table()
+    source_headers = list(df.columns)
+    df = Pipeline(formats=['csv']).replace_import_headers(df)
+    assert list(df.columns) == ['pu_quant', 'pr_codenum', 'description', 'pu_price']
+
+    cleaned = clean_table(df, drop_rows_without_part_number=False, source_headers=source_headers)
+
+    assert cleaned['pr_codenum'].tolist() == ['AB-100', 'AB-200']
+    assert cleaned['pu_quant'].tolist() == [2, 5]
+    assert cleaned['pu_price'].tolist() == [1234.5, 3.0]
+
+
+def test_header_row_matching_the_mapped_headers_is_dropped():
+    df = pd.DataFrame([['pu_quant', 'pr_codenum', 'x'], ['1', 'AB-1', 'y']], columns=['pu_quant', 'pr_codenum', 'description'])
+
+    assert clean_table(df, drop_rows_without_part_number=False)['pr_codenum'].tolist() == ['AB-1']
+
+
+def test_rows_sharing_a_single_word_with_the_headers_are_kept():
+    df = pd.DataFrame([['2', 'AB-100', 'Description', '1.00']], columns=['Qty', 'Deacom #', 'Description', 'Unit Price'])
+    source_headers = list(df.columns)
+    df = Pipeline(formats=['csv']).replace_import_headers(df)
+
+    assert len(clean_table(df, drop_rows_without_part_number=False, source_headers=source_headers)) == 1
+
+
+def test_cells_that_are_not_numbers_are_kept():
+    df = pd.DataFrame({
+        'pu_quant': ['2 EA', '3', '1 BOX', None],
+        'pr_codenum': ['AB-1', 'AB-2', 'AB-3', 'AB-4'],
+        'pu_price': ['$1.50', 'N/C', '2', '4'],
+    })
+
+    cleaned = clean_table(df, drop_rows_without_part_number=False)
+
+    assert cleaned['pu_quant'].tolist()[:3] == ['2 EA', 3.0, '1 BOX']
+    assert pd.isna(cleaned['pu_quant'][3])
+    assert cleaned['pu_price'].tolist() == [1.5, 'N/C', 2.0, 4.0]
+
+
+def test_columns_that_are_all_numbers_become_numeric():
+    cleaned = clean_table(pd.DataFrame({'pr_codenum': ['AB-1', 'AB-2'], 'pu_price': ['$1,234.50', '']}),
+                          drop_rows_without_part_number=False)
+
+    assert cleaned['pu_price'].dtype == float
+    assert cleaned['pu_price'][0] == 1234.5
@@ -0,0 +1,66 @@
+#test_excel_output.py
+import os
+import threading
+import pandas as pd
+import pytest
+from excel_output import AggregatedOutput, StreamingWorkbook
+
+
+def test_concurrent_aggregates_in_one_directory_are_all_kept(tmp_path):
+    # Two multi-page invoices processed at once open their aggregate under the same name
+    path = str(tmp_path / 'invoices_aggregated.xlsx')
+    outputs = [AggregatedOutput(path, 'Aggregated Invoices') for _ in range(2)]
+    assert outputs[0].workbook.temp_path != outputs[1].workbook.temp_path
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def write(index, output):
+        try:
+            for page in range(3):
+                output.write_frame(pd.DataFrame({'ProductCode': [f'd{index}-p{page}']}))
+            barrier.wait()
+            output.close(str(tmp_path / f'd{index}_aggregated.xlsx'))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(index, output)) for index, output in enumerate(outputs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == ['d0_aggregated.xlsx', 'd1_aggregated.xlsx']
+    for index in range(2):
+        df = pd.read_excel(tmp_path / f'd{index}_aggregated.xlsx', index_col=0)
+        assert df['ProductCode'].tolist() == [f'd{index}-p{page}' for page in range(3)]
+
+
+def test_duplicate_columns_are_written_by_position(tmp_path):
+    path = tmp_path / 'table.xlsx'
+    df = pd.DataFrame([[1, 'a', 'b']], columns=['qty', 'description', 'description'])
+
+    with StreamingWorkbook(str(path)) as workbook:
+        workbook.write_frame('Sheet1', df)
+
+    assert pd.read_excel(path).values.tolist() == [[1, 'a', 'b']]
+
+
+def test_workbook_is_discarded_when_writing_fails(tmp_path):
+    with pytest.raises(RuntimeError):
+        with StreamingWorkbook(str(tmp_path / 'table.xlsx')) as workbook:
+            workbook.write_frame('Sheet1', pd.DataFrame({'a': [1]}))
+            raise RuntimeError("failed")
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_long_sheet_names_keep_their_suffix(tmp_path):
+    with StreamingWorkbook(str(tmp_path / 'batch.xlsx')) as workbook:
+        name = 'Vendor invoice 2024-000123 scanned copy'
+        names = [workbook.add_sheet(name, [], suffix=suffix).worksheet.name
+                 for suffix in (' Details', ' Items', ' Details')]
+
+    assert names == ['Vendor invoice 2024-000 Details', 'Vendor invoice 2024-00012 Items',
+                     'Vendor invoice 2024 (2) Details']
+    assert all(len(sheet) <= 31 for sheet in names)
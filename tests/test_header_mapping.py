@@ -0,0 +1,32 @@
+#test_header_mapping.py
+import pandas as pd
+from header_mapping import DEFAULT_HEADER_MAPPINGS, HeaderMapper, find_part_number_column
+
+MAPPINGS = dict(DEFAULT_HEADER_MAPPINGS, **{'deacom #': 'pr_codenum'})
+
+
+def test_headers_are_mapped_ignoring_case_and_whitespace():
+    mapper = HeaderMapper(MAPPINGS)
+
+    assert mapper.map_headers(['QTY', 'Deacom  #', 'Deacom#', 'Description', 'Unit\nPrice']) == [
+        'pu_quant', 'pr_codenum', 'pr_codenum', 'description', 'pu_price']
+
+
+def test_amount_is_mapped_by_position():
+    mapper = HeaderMapper(MAPPINGS)
+
+    assert mapper.map_headers(['Amount', 'Description', 'Amount']) == ['pu_quant', 'description', 'total']
+
+
+def test_unrecognized_headers_are_left_alone():
+    mapper = HeaderMapper(MAPPINGS)
+
+    assert mapper.map_headers(['Description', 'Notes']) is None
+    assert mapper.map_headers(['Description', 'Notes']) is None  # Memoized decision
+
+
+def test_part_number_column_is_found_outside_the_sample():
+    df = pd.DataFrame({'a': ['x'] * 30, 'b': ['y'] * 29 + ['P12-345-678']})
+
+    assert find_part_number_column(df, sample_rows=5) == 1
+    assert find_part_number_column(df.iloc[:, :1]) is None
@@ -0,0 +1,49 @@
+#test_line_items.py
+import pandas as pd
+from line_items import LineItemAccumulator
+
+
+class Sink:
+    def __init__(self):
+        self.frames = []
+
+    def write_frame(self, df):
+        self.frames.append(df)
+
+
+def items(*codes):
+    return pd.DataFrame({'ProductCode': list(codes)})
+
+
+def test_frame_is_in_page_order_whatever_the_arrival_order():
+    accumulator = LineItemAccumulator()
+    accumulator.add(2, [items('c')])
+    accumulator.add(0, [items('a1'), items('a2')])
+    accumulator.add(1, [pd.DataFrame()])
+
+    assert accumulator.frame()['ProductCode'].tolist() == ['a1', 'a2', 'c']
+    assert accumulator.row_count == 3
+
+
+def test_sink_receives_pages_once_every_earlier_page_arrived():
+    sink = Sink()
+    accumulator = LineItemAccumulator(sink)
+
+    accumulator.add(1, [items('b')])
+    assert sink.frames == []  # Held back until page 0 arrives
+    accumulator.add(0, [items('a')])
+    accumulator.skip(2)
+    accumulator.add(3, [items('d')])
+
+    assert [df['ProductCode'].tolist() for df in sink.frames] == [['a'], ['b'], ['d']]
+
+
+def test_close_writes_pages_held_back_by_a_gap():
+    sink = Sink()
+    accumulator = LineItemAccumulator(sink)
+    accumulator.add(2, [items('c')])
+    accumulator.add(1, [items('b')])
+
+    accumulator.close()
+
+    assert [df['ProductCode'].tolist() for df in sink.frames] == [['b'], ['c']]
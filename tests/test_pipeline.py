@@ -0,0 +1,156 @@
+#test_pipeline.py
+import os
+import pandas as pd
+import pytest
+from azure.ai.formrecognizer import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+import price_index
+import settings
+from analysis import AnalysisPool
+from benchmark import synthetic_lpc, synthetic_pdf
+from fake_form_recognizer import FakeFormRecognizer
+from job_ledger import DONE, FAILED, JobLedger
+from pipeline import Pipeline, document_paths
+from result_cache import ResultCache
+from scheduler import RequestScheduler, ScheduledRetryPolicy, TokenBucket
+
+PAGES = 3
+ROWS = 4
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = FakeFormRecognizer(('127.0.0.1', 0), latency=0.05, rows=ROWS, poll_ms=10).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    # Settings and the LPC for this test only
+    monkeypatch.setitem(settings.config, 'analysis', dict(settings.config.get('analysis') or {}))
+    monkeypatch.setitem(settings.config, 'output', dict(settings.config.get('output') or {}, batch_workbook=False))
+    monkeypatch.setitem(settings.config, 'pricing', dict(settings.config.get('pricing') or {}, price_invoices=True))
+    monkeypatch.setattr(price_index, 'LPC_PATH', str(tmp_path / 'lpc.xlsx'))
+    monkeypatch.setattr(price_index, 'SIDECAR_DIR', str(tmp_path / 'lpc'))
+    synthetic_lpc(price_index.LPC_PATH, PAGES, ROWS)
+    source = tmp_path / 'source'
+    source.mkdir()
+    synthetic_pdf(str(source / 'doc.pdf'), PAGES)
+    return tmp_path
+
+
+def run(server, root, doc_type, split_mode, multi_page=False):
+    """
+    Processes root/source/doc.pdf twice with a result cache and job ledger, the second time
+    with reprocess=True, and returns (paths, ledger, submissions per run).
+    """
+    settings.config['analysis'].update(split_mode=split_mode, pages_per_request=2, split_in_memory=True)
+    paths = document_paths(doc_type, str(root))
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+    ledger = JobLedger(str(root / 'jobs.sqlite3'))
+    cache = ResultCache(str(root / 'results'), 100 * 1024 * 1024)
+    client = DocumentAnalysisClient(server.endpoint, AzureKeyCredential('test'), retry_policy=ScheduledRetryPolicy())
+    pool = AnalysisPool(client, server.endpoint, 4, cache=cache, scheduler=RequestScheduler(TokenBucket(50)))
+    pipeline = Pipeline(pool, ['csv'], ledger)
+    document = str(root / 'source' / 'doc.pdf')
+
+    submissions = []
+    for reprocess in (False, True):
+        before = server.counts['submitted']
+        assert pipeline.processPDFs([document], paths, multi_page, doc_type, reprocess=reprocess) == []
+        submissions.append(server.counts['submitted'] - before)
+    assert pipeline.processPDFs([document], paths, multi_page, doc_type) == [document]  # Done, so skipped
+    return paths, ledger, submissions
+
+
+def output_tables(paths, suffix):
+    return {file: pd.read_csv(os.path.join(paths['output'], file))
+            for file in sorted(os.listdir(paths['output'])) if file.endswith(suffix)}
+
+
+def test_purchase_orders_split_into_pages(server, workspace):
+    paths, ledger, submissions = run(server, workspace, 'Purchase Order', 'pages')
+
+    tables = output_tables(paths, '_table_0.csv')
+    assert list(tables) == [f'doc_{page}_table_0.csv' for page in range(1, PAGES + 1)]
+    for df in tables.values():
+        assert list(df.columns[:2]) == ['pu_quant', 'pr_codenum']
+        assert len(df) == ROWS
+        assert df['pr_codenum'].str.match(r'P\d{2}-\d{3}-\d{3}').all()
+    assert ledger.documents()[0]['state'] == DONE
+    assert submissions[1] == 0  # Reprocessed from the result cache
+    assert os.listdir(paths['archive_input']) == ['doc.pdf']
+
+
+def test_purchase_orders_in_page_ranges(server, workspace):
+    paths, ledger, submissions = run(server, workspace, 'Purchase Order', 'document')
+
+    tables = output_tables(paths, '_table_0.csv')
+    assert list(tables) == [f'doc_{page}_table_0.csv' for page in range(1, PAGES + 1)]
+    assert submissions == [2, 0]  # Ranges 1-2 and 3-3, then the cache
+    assert sorted(ledger.page_states(ledger.documents()[0]['id'])) == [1, 3]
+
+
+def test_multi_page_invoice(server, workspace):
+    paths, ledger, submissions = run(server, workspace, 'Invoice', 'pages', multi_page=True)
+
+    items = output_tables(paths, '_items.csv')
+    assert len(items) == PAGES
+    for df in items.values():
+        assert len(df) == ROWS
+        assert df['PO Cost'].notna().all()  # Every fake part number is in the synthetic LPC
+    aggregated = [file for file in os.listdir(paths['output']) if file.endswith('_aggregated.xlsx')]
+    assert len(aggregated) == 1
+    assert len(pd.read_excel(os.path.join(paths['output'], aggregated[0]))) == PAGES * ROWS
+    assert ledger.documents()[0]['state'] == DONE
+    assert submissions[1] == 0
+
+
+def test_batch_workbook_is_closed_when_a_document_raises(workspace, monkeypatch):
+    monkeypatch.setitem(settings.config['output'], 'batch_workbook', True)
+    paths = document_paths('Invoice', str(workspace))
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+
+    def process_file(self, file_path, paths, multi_page, doc_type, output=None, job=None):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(Pipeline, 'process_file', process_file)
+    with pytest.raises(KeyboardInterrupt):
+        Pipeline(formats=['csv']).processPDFs([str(workspace / 'source' / 'doc.pdf')], paths, False, 'Invoice')
+
+    outputs = [file for file in os.listdir(paths['output']) if file.endswith('.xlsx')]
+    assert len(outputs) == 1 and not outputs[0].startswith('~')
+
+
+def test_a_damaged_pdf_does_not_stop_the_batch(server, workspace):
+    settings.config['analysis'].update(split_mode='pages', split_in_memory=True)
+    paths = document_paths('Purchase Order', str(workspace))
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+    bad = workspace / 'source' / 'bad.pdf'
+    bad.write_bytes(b'%PDF-1.4 truncated')
+    ledger = JobLedger(str(workspace / 'jobs.sqlite3'))
+    client = DocumentAnalysisClient(server.endpoint, AzureKeyCredential('test'), retry_policy=ScheduledRetryPolicy())
+    pipeline = Pipeline(AnalysisPool(client, server.endpoint, 4), ['csv'], ledger)
+
+    pipeline.processPDFs([str(bad), str(workspace / 'source' / 'doc.pdf')], paths, False, 'Purchase Order')
+
+    states = {document['name']: document['state'] for document in ledger.documents()}
+    assert states == {'bad.pdf': FAILED, 'doc.pdf': DONE}
+    assert os.listdir(paths['error']) == ['bad.pdf']
+    assert len(output_tables(paths, '_table_0.csv')) == PAGES
+    assert pipeline.last_report.counters['failed_documents'] == 1
+
+
+def test_invoices_are_not_priced_without_the_lpc(server, workspace, capsys):
+    os.remove(price_index.LPC_PATH)
+    paths, ledger, _ = run(server, workspace, 'Invoice', 'pages')
+
+    for df in output_tables(paths, '_items.csv').values():
+        assert 'PO Cost' not in df.columns
+    assert ledger.documents()[0]['state'] == DONE
+    # Reported once per run (the test processes the document twice), not once per page
+    assert capsys.readouterr().out.count('the LPC could not be loaded') == 2
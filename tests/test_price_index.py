@@ -0,0 +1,39 @@
+#test_price_index.py
+import math
+import pandas as pd
+from price_index import PriceIndex, price_check
+
+
+def test_price_check_compares_against_the_lpc_cost():
+    df = pd.DataFrame({
+        'pu_price': ['$2.00', '2.50', '1.00', '3.00'],
+        'pu_quant': [10, 4, 5, 1],
+        'amount': [20, 10, 5, 3],
+        'PO Cost': [2.0, 2.0, None, 0],
+    })
+
+    checked = price_check(df)
+
+    # Matching price: the quantity is kept
+    assert checked.loc[0, ['Adjusted Qty', 'Price Variance', 'Variance %']].tolist() == [10, 0, 0]
+    # Different price: the quantity the amount buys at the LPC cost
+    assert checked.loc[1, ['Adjusted Qty', 'Price Variance', 'Variance %']].tolist() == [5, 0.5, 25]
+    # No or zero LPC cost: nothing to compare against
+    for row in (2, 3):
+        assert all(math.isnan(value) for value in checked.loc[row, ['Adjusted Qty', 'Price Variance', 'Variance %']])
+    assert 'Adjusted Qty' not in df.columns  # The input is left alone
+
+
+def test_price_check_without_a_quantity_column():
+    checked = price_check(pd.DataFrame({'pu_price': [2.0], 'amount': [6.0], 'PO Cost': [2.0]}))
+
+    assert checked['Adjusted Qty'].tolist() == [3.0]
+
+
+def test_price_index_looks_up_normalized_part_numbers():
+    index = PriceIndex(pd.DataFrame({'pr_codenum': ['P01-001-001', 'P01-001-001', None], 'PO Cost': [1.5, 9.9, 3.0]}),
+                       columns=['PO Cost'])
+
+    assert len(index) == 1  # Rows without a part number are dropped and the first duplicate wins
+    assert index.get('P01-001-001')['PO Cost'] == 1.5
+    assert index.get('P99-999-999') is None
@@ -0,0 +1,69 @@
+#test_result_cache.py
+import os
+import time
+from datetime import date
+from azure.ai.formrecognizer import AnalyzeResult
+from result_cache import ResultCache
+
+API_VERSION = '2023-07-31'
+
+
+def invoice_result(vendor='ACME'):
+    field = {'bounding_regions': [], 'spans': [], 'confidence': 0.9}
+    return AnalyzeResult.from_dict({
+        'api_version': API_VERSION, 'model_id': 'prebuilt-invoice', 'content': vendor, 'pages': [], 'tables': [],
+        'documents': [{'doc_type': 'invoice', 'confidence': 1.0, 'bounding_regions': [], 'spans': [], 'fields': {
+            'InvoiceDate': dict(field, value_type='date', value=date(2024, 1, 2), content='1/2/2024'),
+            'VendorName': dict(field, value_type='string', value=vendor, content=vendor),
+        }}],
+    })
+
+
+def test_hit_returns_the_stored_result_with_its_dates(tmp_path):
+    cache = ResultCache(str(tmp_path), 1024 * 1024)
+    assert cache.get('prebuilt-invoice', API_VERSION, b'page') is None
+
+    cache.put('prebuilt-invoice', API_VERSION, b'page', invoice_result())
+    result = cache.get('prebuilt-invoice', API_VERSION, b'page')
+
+    fields = result.documents[0].fields
+    assert fields['InvoiceDate'].value == date(2024, 1, 2)
+    assert fields['VendorName'].value == 'ACME'
+
+
+def test_document_model_version_and_options_are_part_of_the_key(tmp_path):
+    cache = ResultCache(str(tmp_path), 1024 * 1024)
+    cache.put('prebuilt-invoice', API_VERSION, b'page', invoice_result(), pages='1-2')
+
+    assert cache.get('prebuilt-invoice', API_VERSION, b'page', pages='1-2') is not None
+    assert cache.get('prebuilt-invoice', API_VERSION, b'other page', pages='1-2') is None
+    assert cache.get('prebuilt-document', API_VERSION, b'page', pages='1-2') is None
+    assert cache.get('prebuilt-invoice', '2022-08-31', b'page', pages='1-2') is None
+    assert cache.get('prebuilt-invoice', API_VERSION, b'page', pages='3-4') is None
+    assert cache.get('prebuilt-invoice', API_VERSION, b'page') is None
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path), 1024 * 1024)
+    cache.put('prebuilt-invoice', API_VERSION, b'page', invoice_result())
+    path, _, _ = cache.entries()[0]
+    with open(path, 'w') as fd:
+        fd.write('{"result": ')
+
+    assert cache.get('prebuilt-invoice', API_VERSION, b'page') is None
+
+
+def test_prune_removes_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path), 1024 * 1024)
+    pages = [f'page {index}'.encode() for index in range(3)]
+    for age, page in zip((30, 20, 10), pages):
+        cache.put('prebuilt-invoice', API_VERSION, page, invoice_result())
+        path = cache._path(cache.key('prebuilt-invoice', API_VERSION, page))
+        os.utime(path, (time.time() - age, time.time() - age))
+    # Page 0 was stored first, but a hit makes it the most recently used
+    assert cache.get('prebuilt-invoice', API_VERSION, pages[0]) is not None
+    size = sum(size for _, size, _ in cache.entries())
+
+    assert cache.prune(size - 1) == 1
+
+    assert [cache.get('prebuilt-invoice', API_VERSION, page) is not None for page in pages] == [True, False, True]
@@ -0,0 +1,30 @@
+#test_run_report.py
+import json
+from run_report import RunReport
+
+
+def test_reports_started_together_are_all_kept(tmp_path):
+    reports = [RunReport('Invoice') for _ in range(3)]
+    for index, report in enumerate(reports):
+        report.started = reports[0].started  # As if started in the same microsecond
+        report.count('pages', index)
+
+    paths = [report.write(str(tmp_path)) for report in reports]
+
+    assert len(set(paths)) == 3
+    assert [json.load(open(path))['counters'].get('pages', 0) for path in paths] == [0, 1, 2]
+
+
+def test_stages_and_counters():
+    report = RunReport('Purchase Order')
+    with report.activate():
+        with report.stage('output'):
+            with report.stage('header mapping'):
+                pass
+        report.count('pages', 2)
+    report.finish()
+
+    results = report.to_dict()
+    assert results['counters'] == {'pages': 2}
+    assert results['stages']['output']['calls'] == 1
+    assert results['stages']['header mapping']['calls'] == 1
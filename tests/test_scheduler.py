@@ -0,0 +1,111 @@
+#test_scheduler.py
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from azure.core.exceptions import HttpResponseError
+from cancellation import Cancelled, CancellationToken
+from run_report import RunReport
+from scheduler import RequestScheduler, ScheduledRetryPolicy, TokenBucket
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=20, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.1
+
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - started == pytest.approx(0.2, abs=0.1)
+
+
+def test_token_bucket_pause_stops_every_caller():
+    bucket = TokenBucket(rate=100)
+    bucket.pause(0.2)
+    started = time.monotonic()
+
+    bucket.acquire()
+
+    assert time.monotonic() - started >= 0.19
+
+
+def test_token_bucket_wait_ends_when_cancelled():
+    bucket = TokenBucket(rate=1)
+    bucket.pause(30)
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+
+    with pytest.raises(Cancelled):
+        bucket.acquire(token)
+
+    assert time.monotonic() - started < 1
+
+
+def throttled(seconds):
+    error = HttpResponseError("Too many requests")
+    error.status_code = 429
+    error.response = SimpleNamespace(headers={'Retry-After': str(seconds)})
+    return error
+
+
+def test_scheduler_waits_for_retry_after_and_pauses_the_bucket():
+    bucket = TokenBucket(rate=100)
+    scheduler = RequestScheduler(bucket, max_retries=3, backoff_base=0.01)
+    calls = []
+
+    def request():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise throttled(0.2)
+        return 'result'
+
+    report = RunReport()
+    with report.activate():
+        assert scheduler.call(request, 'page_1') == 'result'
+
+    assert [later - earlier >= 0.2 for earlier, later in zip(calls, calls[1:])] == [True, True]
+    assert report.counters['throttled'] == 2
+    assert report.counters['retries'] == 2
+
+
+def test_scheduler_gives_up_after_max_retries():
+    scheduler = RequestScheduler(TokenBucket(rate=100), max_retries=1, backoff_base=0.01)
+
+    with pytest.raises(HttpResponseError):
+        scheduler.call(lambda: (_ for _ in ()).throw(throttled(0)))
+
+
+def test_scheduler_does_not_retry_other_errors():
+    scheduler = RequestScheduler(TokenBucket(rate=100), backoff_base=0.01)
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(request)
+    assert len(calls) == 1
+
+
+def pipeline_response(method, status, headers=None):
+    return SimpleNamespace(http_request=SimpleNamespace(method=method),
+                           http_response=SimpleNamespace(status_code=status, headers=headers or {}))
+
+
+def test_retry_policy_leaves_scheduled_submissions_to_the_scheduler():
+    policy = ScheduledRetryPolicy()
+    settings = policy.configure_retries({})
+    scheduler = RequestScheduler(TokenBucket(rate=100))
+    post = pipeline_response('POST', 429, {'Retry-After': '1'})
+    get = pipeline_response('GET', 429, {'Retry-After': '1'})
+
+    # Sent from RequestScheduler.call: only the submission is returned to the scheduler
+    assert scheduler.call(lambda: policy.is_retry(settings, post)) is False
+    assert scheduler.call(lambda: policy.is_retry(settings, get)) is True
+    # Anything else keeps the SDK's retries
+    assert policy.is_retry(settings, post) is True
+    assert policy.is_retry(settings, get) is True
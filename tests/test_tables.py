@@ -0,0 +1,37 @@
+#test_tables.py
+from azure.ai.formrecognizer import DocumentTable, DocumentTableCell
+from tables import table_frame, table_grid
+
+
+def cell(row, column, content, row_span=None, column_span=None):
+    return DocumentTableCell(row_index=row, column_index=column, content=content,
+                             row_span=row_span, column_span=column_span)
+
+
+def test_table_grid_repeats_spanned_cells_and_keeps_gaps():
+    table = DocumentTable(row_count=3, column_count=3, cells=[
+        cell(0, 0, 'Item'), cell(0, 1, 'Price', column_span=2),
+        cell(1, 0, 'A', row_span=2), cell(1, 1, '1.00'), cell(1, 2, 'USD'),
+        cell(2, 2, 'EUR'),  # No cell at (2, 1)
+    ])
+
+    assert table_grid(table).tolist() == [
+        ['Item', 'Price', 'Price'],
+        ['A', '1.00', 'USD'],
+        ['A', '', 'EUR'],
+    ]
+
+
+def test_table_frame_uses_the_first_row_as_headers():
+    table = DocumentTable(row_count=2, column_count=2, cells=[
+        cell(0, 0, 'Qty'), cell(0, 1, 'Deacom #'), cell(1, 0, '2'), cell(1, 1, 'P01-001-001'),
+    ])
+
+    df = table_frame(table)
+
+    assert list(df.columns) == ['Qty', 'Deacom #']
+    assert df.values.tolist() == [['2', 'P01-001-001']]
+
+
+def test_table_frame_of_an_empty_table():
+    assert table_frame(DocumentTable(row_count=0, column_count=0, cells=[])).empty
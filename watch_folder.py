@@ -0,0 +1,193 @@
+#watch_folder.py
+import argparse
+import os
+import shutil
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from settings import get_setting
+from pipeline import Pipeline, DOC_TYPE_NAMES, document_paths
+
+# Long-running ingestion: PDFs dropped into the watched folder (by hand, a copier, or
+# scanner.scan_to_pdf) are processed within a few seconds, without anyone clicking Process.
+#   python watch_folder.py --doc-type po
+
+# Every complete PDF ends with an end-of-file marker; a file still being written usually does not
+EOF_MARKER = b'%%EOF'
+
+
+def is_complete_pdf(path):
+    """
+    Returns True if the file can be opened for writing and ends with a PDF end-of-file marker.
+
+    Scanners and copiers on Windows hold the file open while writing it, so opening it in
+    r+b mode fails with PermissionError until they are done.
+    """
+    try:
+        with open(path, 'r+b') as fd:
+            fd.seek(0, os.SEEK_END)
+            fd.seek(max(0, fd.tell() - 1024))
+            return EOF_MARKER in fd.read()
+    except OSError:
+        return False
+
+
+class FolderWatcher:
+    def __init__(self, pipeline, folder, paths, doc_type, multi_page=False,
+                 poll_seconds=2.0, settle_seconds=3.0, max_documents=2):
+        """
+        Polls a folder for new PDFs and processes each one once it has finished being written.
+
+        A file is picked up when its size and modification time have not changed for
+        settle_seconds and is_complete_pdf passes. Up to max_documents files are processed
+        at once; requests to Azure are still limited per endpoint by the analysis pool.
+
+        Args:
+            pipeline (Pipeline): The pipeline documents are processed with.
+            folder (str): The folder to watch. Subfolders (e.g. Input/Archive) are ignored.
+            paths (dict): The document type's folders, from document_paths.
+            doc_type (str): 'Invoice' or 'Purchase Order'.
+            multi_page (bool): Passed to processPDFs.
+            poll_seconds (float): Time between scans of the folder.
+            settle_seconds (float): How long a file must stay unchanged before it is processed.
+            max_documents (int): Number of documents processed concurrently.
+        """
+        self.pipeline = pipeline
+        self.folder = folder
+        self.paths = paths
+        self.doc_type = doc_type
+        self.multi_page = multi_page
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.max_documents = max_documents
+
+        self._seen = {}  # path -> ((size, mtime_ns), time the signature was first seen)
+        self._in_flight = set()
+        self._skipped = {}  # path -> signature of files the job ledger said to leave alone
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def ready_files(self, now=None):
+        """
+        Scans the folder once and returns the PDFs that are ready to process, oldest first.
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+        current = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith('.pdf') or entry.name.startswith('~'):
+                    continue
+                current.add(entry.path)
+                with self._lock:
+                    if entry.path in self._in_flight:
+                        continue
+                stat = entry.stat()
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if self._skipped.get(entry.path) == signature:
+                    continue
+                previous = self._seen.get(entry.path)
+                if previous is None or previous[0] != signature:
+                    self._seen[entry.path] = (signature, now)  # New or still growing
+                    continue
+                if stat.st_size > 0 and now - previous[1] >= self.settle_seconds and is_complete_pdf(entry.path):
+                    ready.append((stat.st_mtime_ns, entry.path))
+
+        # Forget files that were moved away
+        for path in set(self._seen) - current:
+            del self._seen[path]
+        for path in set(self._skipped) - current:
+            del self._skipped[path]
+        return [path for _, path in sorted(ready)]
+
+    def process(self, path):
+        """
+        Processes one document. A document that raises is moved to the error folder so it is not retried forever.
+        """
+        try:
+            print(f"Processing {os.path.basename(path)}")
+            stat = os.stat(path)
+            if self.pipeline.processPDFs([path], self.paths, self.multi_page, self.doc_type):
+                # Already processed, or claimed by another worker watching the same folder
+                self._skipped[path] = (stat.st_size, stat.st_mtime_ns)
+            elif os.path.exists(path):
+                # Dropped outside the Input folder; processPDFs has already archived its copy
+                os.remove(path)
+        except Exception:
+            traceback.print_exc()
+            if os.path.exists(path):
+                os.makedirs(self.paths['error'], exist_ok=True)
+                shutil.move(path, os.path.join(self.paths['error'], os.path.basename(path)))
+                print(f"Moved {os.path.basename(path)} to {self.paths['error']}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(path)
+
+    def run(self):
+        """
+        Watches the folder until stop() is called or the process is interrupted.
+        """
+        print(f"Watching {self.folder} for {self.doc_type} PDFs (Ctrl+C to stop)")
+        with ThreadPoolExecutor(max_workers=self.max_documents) as executor:
+            try:
+                while not self._stop.is_set():
+                    for path in self.ready_files():
+                        with self._lock:
+                            self._in_flight.add(path)
+                        executor.submit(self.process, path)
+                    self._stop.wait(self.poll_seconds)
+            except KeyboardInterrupt:
+                print("Stopping; waiting for documents in progress...")
+                self.stop()
+
+
+def create_watcher(doc_type, folder=None, max_documents=None, max_concurrency=None, multi_page=False, formats=None, root=None):
+    """
+    Creates a FolderWatcher with the settings from the watch section of config.yaml.
+
+    Args:
+        doc_type (str): 'Invoice' or 'Purchase Order'.
+        folder (str, optional): The folder to watch; defaults to watch.folder, then the document type's Input folder.
+        max_documents (int, optional): Overrides watch.max_documents.
+        max_concurrency (int, optional): Overrides the endpoint's max_concurrency.
+        multi_page (bool): Passed to processPDFs.
+        formats (list, optional): Output formats for tables; defaults to output.table_formats.
+        root (str, optional): Folder holding the Invoices/ and Purchase Orders/ trees.
+    """
+    paths = document_paths(doc_type, root)
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+
+    folder = folder or get_setting('watch', 'folder', None) or paths['input']
+    max_documents = max_documents or get_setting('watch', 'max_documents', 2)
+
+    return FolderWatcher(
+        Pipeline.for_doc_type(doc_type, max_concurrency, formats),
+        folder,
+        paths,
+        doc_type,
+        multi_page=multi_page,
+        poll_seconds=get_setting('watch', 'poll_seconds', 2),
+        settle_seconds=get_setting('watch', 'settle_seconds', 3),
+        max_documents=max_documents,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process PDFs as they are dropped into a folder.")
+    parser.add_argument('--doc-type', choices=sorted(DOC_TYPE_NAMES), default=get_setting('watch', 'doc_type', 'po'))
+    parser.add_argument('--folder', help="Folder to watch (defaults to watch.folder, then the document type's Input folder)")
+    parser.add_argument('--max-documents', type=int, help="Documents processed at once")
+    parser.add_argument('--concurrency', type=int, help="Concurrent Form Recognizer requests")
+    parser.add_argument('--multi-page', action='store_true', help="Treat the pages of each invoice as one document")
+    args = parser.parse_args(argv)
+
+    create_watcher(DOC_TYPE_NAMES[args.doc_type], args.folder, args.max_documents, args.concurrency, args.multi_page).run()
+
+
+if __name__ == "__main__":
+    main()